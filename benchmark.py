@@ -0,0 +1,324 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import pickle
+import platform
+import random
+import signal
+import statistics
+import sys
+import time
+
+import networkx as nx
+import numpy
+import pulp
+
+import solvers
+from definitions import ROOT_DIR
+
+
+def kernighan_lin_on_gaec(graph, history):
+    # the local search refines the GAEC result like the heuristic solution of the game, its history starts with the
+    # GAEC objective and the times include the GAEC run
+    start_time = time.time()
+    cut, _ = solvers.greedy_additive_edge_contraction(graph)
+    gaec_time = time.time() - start_time
+    local_search_history = []
+    solution = solvers.kernighan_lin(graph, solvers.partition_from_cut(graph, cut), history=local_search_history)
+    history.extend((gaec_time + solving_time, objective) for solving_time, objective in local_search_history)
+    return solution
+
+
+# solvers that can be benchmarked, every solver takes a networkx graph and returns (cut, objective, ...), the cycle
+# ILP solvers also return whether the objective is proven to be optimal, solvers with a statistics argument also report
+# the size of their model
+SOLVERS = {
+    'multicut_ilp': solvers.multicut_ilp,
+    'multicut_ilp_cycle': solvers.multicut_ilp_cycle,
+    'solve_decomposed': solvers.solve_decomposed,
+    'greedy_additive_edge_contraction': solvers.greedy_additive_edge_contraction,
+    'kernighan_lin': kernighan_lin_on_gaec,
+}
+STATISTICS_SOLVERS = {'multicut_ilp', 'multicut_ilp_cycle', 'solve_decomposed'}
+# solvers with a history argument report their objective over time
+HISTORY_SOLVERS = {'kernighan_lin'}
+
+FRAUENKIRCHE_PATH = os.path.join(ROOT_DIR, "assets", "cosmo_instances", "frauenkirche_instance.pickle")
+
+
+def get_weights(rng, num_edges):
+    # the same weights as GraphFactory.get_weights, but from a seeded random generator
+    return [rng.choice([-1, 1]) for _ in range(num_edges)]
+
+
+def generate_grid(rng, width, height):
+    graph = nx.Graph()
+    graph.add_nodes_from(range(width * height))
+    edges = []
+    for y in range(height):
+        for x in range(width):
+            i = y * width + x
+            if x != width - 1:
+                edges.append((i, i + 1))
+            if y != height - 1:
+                edges.append((i, i + width))
+    graph.add_weighted_edges_from((u, v, weight) for (u, v), weight in zip(edges, get_weights(rng, len(edges))))
+    return graph
+
+
+def generate_complete_graph(rng, size):
+    graph = nx.complete_graph(size)
+    for (u, v), weight in zip(graph.edges, get_weights(rng, graph.number_of_edges())):
+        graph[u][v]['weight'] = weight
+    return graph
+
+
+def generate_petersen_graph(rng):
+    graph = nx.petersen_graph()
+    for (u, v), weight in zip(graph.edges, get_weights(rng, graph.number_of_edges())):
+        graph[u][v]['weight'] = weight
+    return graph
+
+
+def generate_random_graph(rng, num_points):
+    # the same construction as GraphFactory.generate_random_graph, the canvas grows with the number of points so they
+    # still fit with the minimum distance
+    scale = math.sqrt(num_points / 20)
+    canvas_size = (980 * scale, 535 * scale)
+    min_distance = 80
+    max_distance = 300
+
+    points = []
+    while len(points) < num_points:
+        new_point = (rng.uniform(40, canvas_size[0] - 40), rng.uniform(40, canvas_size[1] - 40))
+        if all(math.dist(new_point, point) >= min_distance for point in points):
+            points.append(new_point)
+
+    edges = [(m, n) for m in range(num_points) for n in range(m + 1, num_points)
+             if math.dist(points[m], points[n]) < max_distance and 0.5 < rng.random()]
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num_points))
+    graph.add_weighted_edges_from((u, v, weight) for (u, v), weight in zip(edges, get_weights(rng, len(edges))))
+    return graph
+
+
+def load_frauenkirche():
+    with open(FRAUENKIRCHE_PATH, 'rb') as file:
+        file_content = pickle.load(file)
+    graph = nx.Graph()
+    graph.add_nodes_from(file_content['nodes'].keys())
+    graph.add_weighted_edges_from((u, v, weight) for (u, v), weight in file_content['edges'].items())
+    return graph
+
+
+def get_instances(seed):
+    # (family, name, generator) of every instance, each instance has its own random generator seeded with its name so
+    # selecting only some families or instances does not change the generated graphs
+    def seeded(generator, name, *arguments):
+        return lambda: generator(random.Random(f"{seed}-{name}"), *arguments)
+
+    instances = []
+    for size in range(2, 21):
+        name = f"grid_{size}x{size}"
+        instances.append(('grid', name, seeded(generate_grid, name, size, size)))
+    for size in range(5, 15):
+        name = f"complete_{size}"
+        instances.append(('complete', name, seeded(generate_complete_graph, name, size)))
+    instances.append(('petersen', 'petersen', seeded(generate_petersen_graph, 'petersen')))
+    for size in (20, 40, 80):
+        name = f"random_{size}"
+        instances.append(('random', name, seeded(generate_random_graph, name, size)))
+    if os.path.exists(FRAUENKIRCHE_PATH):
+        instances.append(('frauenkirche', 'frauenkirche', load_frauenkirche))
+    else:
+        print(f"frauenkirche instance not found at {FRAUENKIRCHE_PATH}, skipped", file=sys.stderr)
+    return instances
+
+
+def get_peak_memory():
+    # the peak resident memory in bytes of this process or the largest solver process (CBC) it started, whichever is
+    # larger, a solver process starts as a copy of this process so its peak is never below the size of this process
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    unit = 1 if sys.platform == 'darwin' else 1024
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * unit
+
+
+def run_once(connection, solver_name, graph):
+    if hasattr(os, 'setpgrp'):
+        # the run leads its own process group, so a timeout also stops its CBC process
+        os.setpgrp()
+
+    solver = SOLVERS[solver_name]
+    model_statistics = {}
+    history = []
+    arguments = {}
+    if solver_name in STATISTICS_SOLVERS:
+        arguments['statistics'] = model_statistics
+    if solver_name in HISTORY_SOLVERS:
+        arguments['history'] = history
+    start_time = time.perf_counter()
+    solution = solver(graph, **arguments)
+    wall_time = time.perf_counter() - start_time
+    connection.send((float(solution[1]), wall_time, get_peak_memory(), model_statistics, history))
+
+
+def run(context, solver_name, graph, timeout):
+    # every run is a fresh process, so the peak memory belongs to this run only and a solver that does not finish can
+    # be stopped
+    connection, child_connection = context.Pipe(duplex=False)
+    process = context.Process(target=run_once, args=(child_connection, solver_name, graph))
+    process.start()
+    child_connection.close()
+
+    result = None
+    if connection.poll(timeout):
+        try:
+            result = connection.recv()
+        except EOFError:
+            pass
+    if process.is_alive():
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        process.kill()
+    process.join()
+    connection.close()
+
+    if result is None:
+        return 'timeout' if process.exitcode in (None, -signal.SIGKILL) else 'error', None
+    return 'ok', result
+
+
+def benchmark(solver_names, instances, repeat, timeout):
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for family, name, generator in instances:
+        graph = generator()
+        for solver_name in solver_names:
+            entry = {
+                'solver': solver_name,
+                'family': family,
+                'instance': name,
+                'vertices': graph.number_of_nodes(),
+                'edges': graph.number_of_edges(),
+            }
+            runs = []
+            status = 'ok'
+            for _ in range(repeat):
+                status, result = run(context, solver_name, graph, timeout)
+                if status != 'ok':
+                    break
+                runs.append(result)
+
+            entry['status'] = status
+            if len(runs) > 0:
+                objectives, wall_times, peak_memories, model_statistics, histories = zip(*runs)
+                entry['objective'] = objectives[0]
+                entry['wall_time'] = statistics.median(wall_times)
+                entry['wall_times'] = list(wall_times)
+                entry['peak_memory'] = max(peak_memories) if None not in peak_memories else None
+                entry.update(model_statistics[0])
+                if solver_name in HISTORY_SOLVERS:
+                    # the time to quality curve of every run as (seconds, objective) pairs
+                    entry['histories'] = [[list(point) for point in history] for history in histories]
+            results.append(entry)
+            print(f"{solver_name:<34} {name:<16} {status:<8} "
+                  f"{entry.get('objective', ''):>10} {entry.get('wall_time', float('nan')):>9.3f}s", file=sys.stderr)
+    return results
+
+
+def get_time_to_objective(histories, objective):
+    # the median time the runs needed to reach the objective, a run that never reached it counts as infinitely slow
+    return statistics.median(next((solving_time for solving_time, value in history if value <= objective + 1e-6),
+                                  math.inf) for history in histories)
+
+
+def compare(results, baseline, tolerance):
+    # a regression is a worse objective or a wall time that is slower than the baseline by more than the tolerance, for
+    # solvers with a history also a slower time to reach the objective of the baseline
+    baseline = dict(((entry['solver'], entry['instance']), entry) for entry in baseline['results'])
+    regressions = []
+    for entry in results:
+        previous = baseline.get((entry['solver'], entry['instance']))
+        if previous is None or previous['status'] != 'ok':
+            continue
+        if entry['status'] != 'ok':
+            regressions.append(f"{entry['solver']} {entry['instance']}: {entry['status']}")
+        elif entry['objective'] > previous['objective'] + 1e-6:
+            regressions.append(f"{entry['solver']} {entry['instance']}: objective {previous['objective']} -> "
+                               f"{entry['objective']}")
+        elif entry['wall_time'] > previous['wall_time'] * (1 + tolerance) and entry['wall_time'] > 0.05:
+            regressions.append(f"{entry['solver']} {entry['instance']}: wall time {previous['wall_time']:.3f}s -> "
+                               f"{entry['wall_time']:.3f}s")
+        elif 'histories' in entry and 'histories' in previous:
+            previous_time = get_time_to_objective(previous['histories'], previous['objective'])
+            time_to_objective = get_time_to_objective(entry['histories'], previous['objective'])
+            if time_to_objective > previous_time * (1 + tolerance) and time_to_objective > 0.05:
+                regressions.append(f"{entry['solver']} {entry['instance']}: time to objective {previous['objective']} "
+                                   f"{previous_time:.3f}s -> {time_to_objective:.3f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the multicut solvers on the graph families of the game.")
+    parser.add_argument('--solver', action='append', choices=sorted(SOLVERS.keys()),
+                        help="solver to benchmark, can be given multiple times (default: all)")
+    parser.add_argument('--family', action='append',
+                        choices=['grid', 'complete', 'petersen', 'random', 'frauenkirche'],
+                        help="graph family to benchmark, can be given multiple times (default: all)")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the generated instances")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per solver and instance, the median is reported")
+    parser.add_argument('--timeout', type=float, default=60, help="seconds until a run is stopped")
+    parser.add_argument('--output', help="JSON file for the results (default: standard output)")
+    parser.add_argument('--compare', help="JSON file of an earlier run, exits with status 1 on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="relative wall time increase that counts as a regression")
+    arguments = parser.parse_args()
+
+    solver_names = arguments.solver or list(SOLVERS.keys())
+    instances = [instance for instance in get_instances(arguments.seed)
+                 if arguments.family is None or instance[0] in arguments.family]
+
+    results = {
+        'metadata': {
+            'seed': arguments.seed,
+            'repeat': arguments.repeat,
+            'timeout': arguments.timeout,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'networkx': nx.__version__,
+            'numpy': numpy.__version__,
+            'pulp': pulp.__version__,
+        },
+        'results': benchmark(solver_names, instances, arguments.repeat, arguments.timeout),
+    }
+
+    if arguments.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if arguments.compare is not None:
+        with open(arguments.compare) as file:
+            regressions = compare(results['results'], json.load(file), arguments.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if len(regressions) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@ import pygame
 
 import colors
 from colors import *
-from utils import add_pos
+from utils import add_pos, get_font, render_text
 
 
 class Button:
@@ -33,16 +33,12 @@ class Button:
         if label.__class__ != str:
             self.is_icon = True
 
-        font_size = 32
-        self.font = pygame.font.SysFont('Ariel', font_size)
-        self.text_surface = self.font.render(self.label if not self.is_icon else '', True, self.text_color)
-        self.text_rec = self.text_surface.get_rect()
+        self.font_size = 32
+        self.text_rec = pygame.Rect((0, 0), get_font(self.font_size).size(self.label if not self.is_icon else ''))
         # if text is too big reduce font_size until it fits
         while self.text_rec.width > size[0] or self.text_rec.height > size[1]:
-            font_size -= 1
-            self.font = pygame.font.SysFont('Ariel', font_size)
-            self.text_surface = self.font.render(self.label if not self.is_icon else '', True, self.text_color)
-            self.text_rec = self.text_surface.get_rect()
+            self.font_size -= 1
+            self.text_rec.size = get_font(self.font_size).size(self.label if not self.is_icon else '')
 
         self.text_rec.center = (size[0] / 2, size[1] / 2)
 
@@ -70,7 +66,7 @@ class Button:
 
         fill_color, border_color, text_color = self.get_colors()
 
-        self.text_surface = self.font.render(self.label if not self.is_icon else '', True, text_color)
+        self.text_surface = render_text(self.label if not self.is_icon else '', self.font_size, text_color)
         rec = self.surface.get_rect()
         rec.move(add_pos((rec.x, rec.y), self.offset))
         center = rec.center
@@ -177,7 +173,7 @@ class Switch(Button):
 
         fill_color, border_color, text_color = self.get_colors()
 
-        self.text_surface = self.font.render(self.label if not self.is_icon else '', True, text_color)
+        self.text_surface = render_text(self.label if not self.is_icon else '', self.font_size, text_color)
         rec = self.surface.get_rect()
         rec.move(add_pos((rec.x, rec.y), self.offset))
         center = rec.center
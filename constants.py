@@ -2,11 +2,23 @@ from utils import add_pos, sub_pos
 
 # main
 FRAMES_PER_SECOND = 60
+# milliseconds the game waits for an event at most when nothing changes
+IDLE_WAIT_TIME = 1000
 SCREEN_SIZE = (1280, 720)
 MENU_MARGIN = 50
 
 CUT_AUTO_GAP = False
 
+# text
+FONT_NAME = 'Ariel'
+TEXT_CACHE_MAX_ENTRIES = 256
+
+# solver
+SOLVER_MAX_WORKERS = 2
+SOLUTION_CACHE_MAX_ENTRIES = 1000
+# seconds until the best known solution is used instead of the proven optimal one
+SOLVER_TIME_LIMIT = 60
+
 # game mode
 GAME_MODE_SCREEN_OFFSET = (300, 0)
 GAME_MODE_HEAD_OFFSET = GAME_MODE_SCREEN_OFFSET
@@ -33,3 +45,8 @@ GRAPH_GROUP_OVERSIZE = 20
 GRAPH_PENTAGRAM_RADIUS = 100
 GRAPH_CUT_GAP = 10
 GRAPH_CUT_LINE_POINT_DISTANCE = 5
+GRAPH_UNDO_STEPS = 100
+# outlines a group keeps for its recent layouts, a dragged group alternates between a few layouts because of rounding
+GRAPH_GROUP_POLYGON_CACHE_SIZE = 4
+# crossing segments of a group outline are searched in chunks of at most this many pairs of segments
+GRAPH_GROUP_POLYGON_MAX_PAIRS = 100000
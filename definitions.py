@@ -1,3 +1,4 @@
 import os
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.multicut_game')
@@ -33,6 +33,7 @@ class ClassicGameMode(GameMode):
         self.headline = 'Try it!'
 
     def regenerate_graph(self):
+        self.active_graph.cancel_solution()
         if self.graph_type == 'grid':
             self.active_graph = GraphFactory.generate_grid(self.size_factor, (self.graph_width, self.graph_height))
         elif self.graph_type == 'pentagram':
@@ -41,6 +41,7 @@ class CompleteStep1(GameStep):
         self.graph = GraphFactory.generate_complete_graph(self.size_factor, graph_size)
 
     def regenerate_graph(self):
+        self.graph.cancel_solution()
         self.graph = GraphFactory.generate_complete_graph(self.size_factor, self.graph_size)
         self.game_mode.active_graph = self.graph
         self.game_mode.active_graph.reset_to_one_group()
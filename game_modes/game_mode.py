@@ -45,23 +45,30 @@ class GameMode(metaclass=abc.ABCMeta):
         self.is_cutting = False
         self.cut_line = []
         self.cut_edge_set = set()
+        # the end of the cut line that was drawn last, from the point with the index cut_line_start to the mouse
+        self.cut_line_start = 0
+        self.cut_line_rec = pygame.Rect(0, 0, 0, 0)
 
         self.rec = pygame.Rect(*constants.GAME_MODE_SCREEN_OFFSET, *constants.GAME_MODE_SCREEN_SIZE)
 
         self.active_graph = None
         self.score_drawn = False
+        self.progress_drawn = None
         self.move_vertex = None
         self.move_group = None
         self.group_mouse_distance = None
         self.highlight_group = None
 
-        self.font = pygame.font.SysFont('Ariel', 32)
+        self.font_size = 32
         self.show_headline = True
         self.standard_headline = ''
         self.headline = ''
         self.show_points = True
 
         self.draw_necessary = True
+        self.draw_cut_line_necessary = False
+        # the regions of the surface that were drawn since the game was drawn last
+        self.dirty_recs = []
 
         self.was_solved = False
 
@@ -97,6 +104,7 @@ class GameMode(metaclass=abc.ABCMeta):
         self.headline = self.standard_headline
         self.was_solved = False
         self.score_drawn = False
+        self.progress_drawn = None
 
     def change_all_buttons(self, action):
         for button in self.buttons.values():
@@ -114,7 +122,7 @@ class GameMode(metaclass=abc.ABCMeta):
             self.headline = self.standard_headline
 
         self.text_box_surface.fill(colors.COLOR_KEY)
-        utils.blit_text(self.text_box_surface, self.headline, (0, 0), self.font, colors.BLACK)
+        utils.blit_text(self.text_box_surface, self.headline, (0, 0), self.font_size, colors.BLACK)
 
         self.head_surface.blit(self.text_box_surface, (constants.GAME_MODE_MARGIN, constants.GAME_MODE_MARGIN,
                                                        *self.text_box_surface.get_size()))
@@ -123,7 +131,23 @@ class GameMode(metaclass=abc.ABCMeta):
         if self.active_graph is not None:
             score = self.active_graph.get_score()
             optimal_score = self.active_graph.optimal_score
-            if optimal_score is None:
+            heuristic_score = self.active_graph.heuristic_score
+            best_score = self.active_graph.best_score
+            best_gap = self.active_graph.best_gap
+            if optimal_score is None and self.active_graph.best_edge_set is not None:
+                # the solver ran out of time, the best known score is the target score
+                optimal_score = f"{round(best_score)} (time limit reached"
+                if best_gap is not None:
+                    optimal_score += f", gap {round(100 * best_gap)}%"
+                optimal_score += ")"
+            elif optimal_score is None and best_score is not None:
+                # the solver is still running, the optimal score is at most the best known score
+                optimal_score = f"best ≤ {round(best_score)}"
+                if best_gap is not None:
+                    optimal_score += f" (gap {round(100 * best_gap)}%)"
+            elif optimal_score is None and heuristic_score is not None:
+                optimal_score = f"calculating (≤ {round(heuristic_score)})"
+            elif optimal_score is None:
                 optimal_score = "calculating"
             else:
                 optimal_score = str(round(optimal_score))
@@ -131,12 +155,13 @@ class GameMode(metaclass=abc.ABCMeta):
             score = ''
             optimal_score = ''
 
-        score_surface = self.font.render('Score' + f" = {score}", True, colors.BLACK)
+        score_surface = utils.render_text('Score' + f" = {score}", self.font_size, colors.BLACK)
         score_rec = score_surface.get_rect()
         score_rec = score_surface.get_rect().move(
             (constants.GAME_MODE_MARGIN, constants.GAME_MODE_HEAD_SIZE[1] - constants.GAME_MODE_MARGIN - score_rec.height))
 
-        optimal_score_surface = self.font.render('Optimal Score' + f" = {optimal_score}", True, colors.BLACK)
+        optimal_score_surface = utils.render_text('Optimal Score' + f" = {optimal_score}", self.font_size,
+                                                  colors.BLACK)
         optimal_score_rec = optimal_score_surface.get_rect().move(
             (score_rec.x + score_rec.width + constants.GAME_MODE_MARGIN, score_rec.y))
 
@@ -146,46 +171,98 @@ class GameMode(metaclass=abc.ABCMeta):
     def objects(self):
         return self.surface, self.rec
 
+    def get_dirty_recs(self):
+        # the regions of the screen that changed since the last call
+        dirty_recs = [rec.move(self.rec.topleft) for rec in self.dirty_recs]
+        self.dirty_recs = []
+        return dirty_recs
+
+    def get_cut_line_rec(self, start=0):
+        # the region of the body that contains the cut line from the point with the index start to the mouse
+        points = self.cut_line[start:] + [self.graph_mouse_pos]
+        left, top = min(x for x, _ in points), min(y for _, y in points)
+        right, bottom = max(x for x, _ in points), max(y for _, y in points)
+        return pygame.Rect(left - 1, top - 1, right - left + 3, bottom - top + 3)
+
+    def update_surface(self, part_surface, offset, rec):
+        # copies the region rec of the head or body surface to the surface
+        rec = rec.clip(part_surface.get_rect())
+        surface_rec = rec.move(offset)
+        self.surface.fill(colors.COLOR_KEY, surface_rec)
+        self.surface.blit(part_surface, surface_rec, rec)
+        self.dirty_recs.append(surface_rec)
+
     def _draw_wrapper(self):
-        if not self.draw_necessary:
+        if self.draw_necessary:
+            self.draw_necessary = False
+            self.draw_cut_line_necessary = False
+            self.head_surface.fill(colors.COLOR_KEY)
+            for button in self.buttons.values():
+                self.head_surface.blit(*button.objects())
+            if self.show_points:
+                self.print_score()
+            if self.show_headline:
+                self.print_headline()
+
+            self.draw_body()
+
+            self.surface.fill(colors.COLOR_KEY)
+            self.surface.blit(self.head_surface, constants.GAME_MODE_HEAD_RELATIVE_OFFSET)
+            self.surface.blit(self.body_surface, constants.GAME_MODE_BODY_RELATIVE_OFFSET)
+
+            # draw border
+            rec = pygame.Rect(sub_pos(constants.GAME_MODE_BODY_RELATIVE_OFFSET, (0, 2)),
+                              (constants.GAME_MODE_SCREEN_SIZE[0], 2))
+            pygame.draw.rect(self.surface, colors.GREY, rec)
+            self.dirty_recs = [self.surface.get_rect()]
             return
-        self.draw_necessary = False
-        self.head_surface.fill(colors.COLOR_KEY)
-        self.body_surface.fill(colors.COLOR_KEY)
-        self.surface.fill(colors.COLOR_KEY)
 
+        # otherwise only the buttons that changed and the end of the cut line are drawn again
         for button in self.buttons.values():
-            self.head_surface.blit(*button.objects())
+            if button.draw_necessary:
+                self.head_surface.fill(colors.COLOR_KEY, button.rec)
+                self.head_surface.blit(*button.objects())
+                self.update_surface(self.head_surface, constants.GAME_MODE_HEAD_RELATIVE_OFFSET, button.rec)
+
+        if self.draw_cut_line_necessary:
+            self.draw_cut_line_necessary = False
+            rec = self.cut_line_rec.union(self.get_cut_line_rec(self.cut_line_start))
+            self.draw_body(rec)
+            self.update_surface(self.body_surface, constants.GAME_MODE_BODY_RELATIVE_OFFSET, rec)
+
+    def draw_body(self, rec=None):
+        # with rec only that region of the body is drawn again, the graph did not change then and its surface is only
+        # blitted again
+        self.body_surface.set_clip(rec)
+        self.body_surface.fill(colors.COLOR_KEY)
 
         if self.active_graph is not None:
-            self.active_graph.draw(self.highlight_group, self.buttons['solution'].get_mode())
+            if rec is None:
+                moving_group = self.move_group
+                if self.move_vertex is not None:
+                    moving_group = self.move_vertex.group
+                self.active_graph.draw(self.highlight_group, self.buttons['solution'].get_mode(), moving_group)
             self.body_surface.blit(*self.active_graph.objects())
-        if self.show_points:
-            self.print_score()
-        if self.show_headline:
-            self.print_headline()
 
-        # draw cut line
+        # draw cut line, it is not clipped because a clipped line is rasterized slightly differently, outside of rec it
+        # only covers the same pixels again and that part of the body is not used
         if len(self.cut_line) != 0:
+            self.body_surface.set_clip(None)
             prev_point = None
             for point in self.cut_line:
                 if prev_point is not None:
                     gfxdraw.line(self.body_surface, *point, *prev_point, colors.BLACK)
                 prev_point = point
             gfxdraw.line(self.body_surface, *prev_point, *self.graph_mouse_pos, colors.BLACK)
+            self.cut_line_start = len(self.cut_line) - 1
+            self.cut_line_rec = self.get_cut_line_rec(self.cut_line_start)
+            self.body_surface.set_clip(rec)
 
         self.draw()
 
         if self.active_graph.deactivated:
             self.body_surface.blit(self.grey_overlay, (0, 0))
-
-        self.surface.blit(self.head_surface, constants.GAME_MODE_HEAD_RELATIVE_OFFSET)
-        self.surface.blit(self.body_surface, constants.GAME_MODE_BODY_RELATIVE_OFFSET)
-
-        # draw border
-        rec = pygame.Rect(sub_pos(constants.GAME_MODE_BODY_RELATIVE_OFFSET, (0, 2)),
-                          (constants.GAME_MODE_SCREEN_SIZE[0], 2))
-        pygame.draw.rect(self.surface, colors.GREY, rec)
+        self.body_surface.set_clip(None)
 
     def mouse_down_event(self):
         for button in self.buttons.values():
@@ -204,12 +281,9 @@ class GameMode(metaclass=abc.ABCMeta):
                     self.group_mouse_distance = utils.sub_pos(self.move_group.pos, self.graph_mouse_pos)
                     break
         else:
-            for vertex in self.active_graph.vertices.values():
-                if vertex.is_hit(self.graph_mouse_pos):
-                    self.move_vertex = vertex
-                    if len(self.move_vertex.group.vertices) > 1:
-                        self.active_graph.move_vertex_to_group(self.move_vertex, None)
-                    break
+            self.move_vertex = self.active_graph.get_hit_vertex(self.graph_mouse_pos)
+            if self.move_vertex is not None and len(self.move_vertex.group.vertices) > 1:
+                self.active_graph.move_vertex_to_group(self.move_vertex, None)
 
         if (self.move_vertex is None and self.move_group is None
                 and pygame.Rect(constants.GAME_MODE_BODY_OFFSET,
@@ -237,6 +311,10 @@ class GameMode(metaclass=abc.ABCMeta):
                 if self.active_graph.state_saving:
                     self.active_graph.save_state()
 
+        # the moved vertex or group was drawn on top of everything else while it moved
+        if self.move_vertex is not None or self.move_group is not None:
+            self.draw_necessary = True
+
         self.move_vertex = None
         self.move_group = None
         self.is_cutting = False
@@ -253,9 +331,14 @@ class GameMode(metaclass=abc.ABCMeta):
         self.game_mode_mouse_pos = sub_pos(self.mouse_pos, constants.GAME_MODE_SCREEN_OFFSET)
 
         # if the score has been calculated, print it
-        if self.active_graph is not None and not self.score_drawn and self.active_graph.optimal_score is not None:
+        if self.active_graph is not None and not self.score_drawn and self.active_graph.get_target_score() is not None:
             self.score_drawn = True
             self.draw_necessary = True
+        if self.active_graph is not None:
+            progress = (self.active_graph.heuristic_score, self.active_graph.best_score, self.active_graph.best_gap)
+            if progress != self.progress_drawn:
+                self.progress_drawn = progress
+                self.draw_necessary = True
 
         # check events
         for event in events:
@@ -284,10 +367,9 @@ class GameMode(metaclass=abc.ABCMeta):
                 self.highlight_group = group_hit
             self.draw_necessary = True
 
-        # mark hover effect
+        # mark hover effect, buttons that changed are drawn again on their own
         for button in self.buttons.values():
-            if button.hover(button.collides(self.game_mode_mouse_pos)):
-                self.draw_necessary = True
+            button.hover(button.collides(self.game_mode_mouse_pos))
 
         # calculate cut line
         if self.is_cutting:
@@ -297,7 +379,7 @@ class GameMode(metaclass=abc.ABCMeta):
                     self.cut_edge_set = self.cut_edge_set.union(
                         self.active_graph.get_intersected_edges(self.cut_line[-1], self.graph_mouse_pos))
                 self.cut_line.append(self.graph_mouse_pos)
-            self.draw_necessary = True
+            self.draw_cut_line_necessary = True
 
         # make the cut
         if not self.is_cutting and len(self.cut_line) != 0:
@@ -314,6 +396,10 @@ class GameMode(metaclass=abc.ABCMeta):
         self.active_graph.deactivated = True
         self.draw_necessary = True
 
+    def get_wake_up_time(self):
+        # the time (as time.time()) when the game mode changes without an event, None if it only changes by events
+        return None
+
     @abc.abstractmethod
     def draw(self):
         pass
@@ -39,6 +39,7 @@ class GreedyJoining(GameMode):
         super().reset_graph(one_group, False)
 
     def regenerate_graph(self):
+        self.active_graph.cancel_solution()
         self.active_graph = GraphFactory.generate_grid(self.size_factor, (5, 5), state_saving=True)
         self.standard_headline = self.initial_headline
         self.headline = self.standard_headline
@@ -50,6 +51,12 @@ class GreedyJoining(GameMode):
     def graph_solved_event(self):
         pass
 
+    def get_wake_up_time(self):
+        # the headline changes back after 3 seconds
+        if self.headline_change_timestamp is None:
+            return None
+        return self.headline_change_timestamp + 3
+
     def switch_to(self):
         pass
 
@@ -58,7 +65,7 @@ class GreedyJoining(GameMode):
 
     def run(self):
         if self.active_graph.has_changed:
-            if self.active_graph.get_score() == self.active_graph.optimal_score:
+            if self.active_graph.is_solved():
                 self.active_graph.deactivated = True
                 self.standard_headline = 'Great! You solved it.'
                 self.headline = self.standard_headline
@@ -74,9 +81,9 @@ class GreedyJoining(GameMode):
                 self.change_all_buttons('show')
                 self.change_all_buttons('activate')
             elif ((not self.free_mode) and
-                  self.active_graph.get_score() - self.active_graph.prev_state.get_score() >
-                  self.active_graph.prev_state.get_best_score_improvement()):
-                self.active_graph = self.active_graph.prev_state
+                  self.active_graph.get_score() - self.active_graph.saved_score >
+                  self.active_graph.saved_best_score_improvement):
+                self.active_graph.restore_state()
                 self.headline = 'That is not the best move.'
                 self.headline_change_timestamp = time.time()
                 self.move_vertex = None
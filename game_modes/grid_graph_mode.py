@@ -39,6 +39,7 @@ class GridStep1(GameStep):
         self.graph = GraphFactory.generate_grid(self.size_factor, self.graph_size)
 
     def regenerate_graph(self):
+        self.graph.cancel_solution()
         self.graph = GraphFactory.generate_grid(self.size_factor, self.graph_size)
         self.game_mode.active_graph = self.graph
         self.game_mode.active_graph.reset_to_one_group()
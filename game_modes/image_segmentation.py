@@ -275,6 +275,12 @@ class SegmentationStep2(GameStep):
                 self.game_mode.change_all_buttons('activate')
                 self.game_mode.buttons['next'].deactivate()
 
+    def get_wake_up_time(self):
+        # the next stage of the animation or the next vertex of the overlay
+        if self.animation_finished:
+            return None
+        return self.prev_timestamp + (0.2 if self.animation_stage == 2 else 3)
+
     def is_finished(self):
         is_finished = self.game_mode.active_graph.is_solved()
         if self.has_finished:
@@ -55,6 +55,9 @@ class WalkthroughGameMode(GameMode):
     def graph_solved_event(self):
         pass
 
+    def get_wake_up_time(self):
+        return self.current_step.get_wake_up_time()
+
     def switch_to(self):
         pass
 
@@ -115,6 +118,9 @@ class GameStep:
     def run(self):
         pass
 
+    def get_wake_up_time(self):
+        return None
+
     def is_finished(self):
         pass
 
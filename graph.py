@@ -1,7 +1,8 @@
-import copy
+import collections
+import heapq
+import itertools
 import math
 import random
-import threading
 
 import networkx as nx
 import numpy
@@ -10,27 +11,26 @@ from pygame import gfxdraw
 from shapely.geometry import Point
 from shapely.geometry.polygon import Polygon
 
-import colors
 import constants
 import utils
 from colors import *
-from solvers import multicut_ilp
+from solver_service import solver_service
+from union_find import UnionFind
 from utils import draw_thick_aaline, draw_cut_thick_aaline, calculate_polygon, generate_distinct_colors, \
     line_line_intersect
 
+# posted when a solver result of a graph arrived
+SOLVER_EVENT = pygame.event.custom_type()
+
 
 class GraphFactory:
     @staticmethod
     def center_graph(graph):
-        vertex_avg_center = (0, 0)
-        for vertex in graph.vertices.values():
-            vertex_avg_center = utils.add_pos(vertex_avg_center, vertex.pos)
-        vertex_avg_center = utils.div_pos(vertex_avg_center, (len(graph.vertices), len(graph.vertices)))
-        center_difference = utils.sub_pos(graph.rec.center, vertex_avg_center)
+        center_difference = numpy.array(graph.rec.center) - graph.positions.mean(axis=0)
+        graph.positions = numpy.round(graph.positions + center_difference).astype(int)
+        graph.init_positions = graph.positions.copy()
         for vertex in graph.vertices.values():
-            vertex.move(utils.add_pos(vertex.pos, center_difference))
-            vertex.init_pos = vertex.pos
-            vertex.group.init_pos = vertex.pos
+            vertex.group.pos = vertex.group.init_pos = vertex.pos
 
     @staticmethod
     def generate_grid(size_factor, size, seed=None, state_saving=False):
@@ -38,37 +38,31 @@ class GraphFactory:
         num_edges = 2 * size[0] * size[1] - size[0] - size[1]
         weights = GraphFactory.get_weights(num_edges, seed)
 
-        # generate vertices
-        graph = Graph(size_factor, *(0, 0), *constants.GAME_MODE_BODY_SIZE, state_saving)
-        i = 0
-        for y in range(size[1]):
-            for x in range(size[0]):
-                graph.add_vertex(Vertex(size_factor, i, (
-                    (x * constants.GRAPH_VERTEX_DISTANCE_GRID + constants.GRAPH_RELATIVE_OFFSET[0]) * size_factor,
-                    (y * constants.GRAPH_VERTEX_DISTANCE_GRID + constants.GRAPH_RELATIVE_OFFSET[1]) * size_factor)))
-                i += 1
+        # generate vertices, the vertex (x, y) has the index y * width + x
+        xs, ys = numpy.meshgrid(numpy.arange(size[0]), numpy.arange(size[1]))
+        positions = numpy.column_stack((
+            (xs.ravel() * constants.GRAPH_VERTEX_DISTANCE_GRID + constants.GRAPH_RELATIVE_OFFSET[0]) * size_factor,
+            (ys.ravel() * constants.GRAPH_VERTEX_DISTANCE_GRID + constants.GRAPH_RELATIVE_OFFSET[1]) * size_factor))
 
         # generate edges
+        edges = []
         i = 0
-        j = 0
         for y in range(size[1]):
             for x in range(size[0]):
                 if x != size[0] - 1:
-                    graph.add_edge(i, i + 1, weights[j])
-                    j += 1
+                    edges.append((i, i + 1))
                 if y != size[1] - 1:
-                    graph.add_edge(i, i + size[0], weights[j])
-                    j += 1
+                    edges.append((i, i + size[0]))
                 i += 1
 
+        graph = Graph.from_arrays(size_factor, positions, edges, weights[:num_edges], state_saving=state_saving)
         GraphFactory.center_graph(graph)
 
         graph.set_unchanged()
         graph.save_state()
 
-        # calculating optimal solution is done in a new thread so the game can continue
-        my_thread = threading.Thread(target=graph.calculate_solution)
-        my_thread.start()
+        # calculating optimal solution is done in a solver process so the game can continue
+        graph.calculate_solution()
         return graph
 
     @staticmethod
@@ -77,8 +71,6 @@ class GraphFactory:
         num_edges = size * (size - 1) // 2
         weights = GraphFactory.get_weights(num_edges, seed)
 
-        graph = Graph(size_factor, *(0, 0), *constants.GAME_MODE_BODY_SIZE)
-
         angle_distance = 360 / size
         radius = constants.GRAPH_PENTAGRAM_RADIUS
         if size > 5:
@@ -86,23 +78,23 @@ class GraphFactory:
         center = ((constants.GRAPH_RELATIVE_OFFSET[0] + radius) * size_factor,
                   (constants.GRAPH_RELATIVE_OFFSET[1] + radius) * size_factor)
 
-        k = 0
+        positions = []
+        edges = []
         for i in range(size):
             x = radius * (math.sin(math.pi * 2 * (angle_distance * i) / 360)) + center[0]
             y = -(radius * (math.cos(math.pi * 2 * (angle_distance * i) / 360))) + center[1]
-            graph.add_vertex(Vertex(size_factor, i, (x, y)))
+            positions.append((x, y))
             for j in range(i):
-                graph.add_edge(i, j, weights[k])
-                k += 1
+                edges.append((i, j))
 
+        graph = Graph.from_arrays(size_factor, positions, edges, weights[:num_edges])
         GraphFactory.center_graph(graph)
 
         graph.set_unchanged()
         graph.save_state()
 
-        # calculating optimal solution is done in a new thread so the game can continue
-        my_thread = threading.Thread(target=graph.calculate_solution)
-        my_thread.start()
+        # calculating optimal solution is done in a solver process so the game can continue
+        graph.calculate_solution()
         return graph
 
     @staticmethod
@@ -111,42 +103,33 @@ class GraphFactory:
         size = 5
         weights = GraphFactory.get_weights(15)
 
-        graph = Graph(1, *(0, 0), *constants.GAME_MODE_BODY_SIZE)
-
         angle_distance = 360 / size
         inner_radius = constants.GRAPH_PENTAGRAM_RADIUS
         outer_radius = constants.GRAPH_PENTAGRAM_RADIUS + 130
         center = ((constants.GRAPH_RELATIVE_OFFSET[0] + inner_radius) * size_factor,
                   (constants.GRAPH_RELATIVE_OFFSET[1] + inner_radius) * size_factor)
 
-        vertex_id = 0
-        k = 0
-
+        positions = []
+        edges = []
         for i in range(size):
             x = inner_radius * (math.sin(math.pi * 2 * (angle_distance * i) / 360)) + center[0]
             y = -(inner_radius * (math.cos(math.pi * 2 * (angle_distance * i) / 360))) + center[1]
-            graph.add_vertex(Vertex(size_factor, vertex_id, (x, y)))
-            vertex_id += 1
+            positions.append((x, y))
             x = outer_radius * (math.sin(math.pi * 2 * (angle_distance * i) / 360)) + center[0]
             y = -(outer_radius * (math.cos(math.pi * 2 * (angle_distance * i) / 360))) + center[1]
-            graph.add_vertex(Vertex(size_factor, vertex_id, (x, y)))
-            graph.add_edge(vertex_id - 1, vertex_id, weights[k])
-            k += 1
-            vertex_id += 1
+            positions.append((x, y))
+            edges.append((2 * i, 2 * i + 1))
 
-        edges = [(1, 3), (3, 5), (5, 7), (7, 9), (9, 1), (0, 4), (4, 8), (8, 2), (2, 6), (6, 0)]
-        for vertex1, vertex2 in edges:
-            graph.add_edge(vertex1, vertex2, weights[k])
-            k += 1
+        edges += [(1, 3), (3, 5), (5, 7), (7, 9), (9, 1), (0, 4), (4, 8), (8, 2), (2, 6), (6, 0)]
 
+        graph = Graph.from_arrays(size_factor, positions, edges, weights)
         GraphFactory.center_graph(graph)
 
         graph.set_unchanged()
         graph.save_state()
 
-        # calculating optimal solution is done in a new thread so the game can continue
-        my_thread = threading.Thread(target=graph.calculate_solution)
-        my_thread.start()
+        # calculating optimal solution is done in a solver process so the game can continue
+        graph.calculate_solution()
         return graph
 
     @staticmethod
@@ -197,11 +180,10 @@ class GraphFactory:
 
     @staticmethod
     def generate_graph_from(size_factor, vertices, edges, centralize=True):
-        graph = Graph(size_factor, *(0, 0), *constants.GAME_MODE_BODY_SIZE)
-        for vertex_id, pos in vertices.items():
-            graph.add_vertex(Vertex(size_factor, vertex_id, pos))
-        for vertex_tuple, weight in edges.items():
-            graph.add_edge(*vertex_tuple, weight)
+        vertex_index = dict((vertex_id, i) for i, vertex_id in enumerate(vertices.keys()))
+        graph = Graph.from_arrays(size_factor, list(vertices.values()),
+                                  [(vertex_index[vertex1], vertex_index[vertex2]) for vertex1, vertex2 in edges.keys()],
+                                  list(edges.values()), list(vertices.keys()))
 
         if centralize:
             GraphFactory.center_graph(graph)
@@ -209,60 +191,228 @@ class GraphFactory:
         graph.set_unchanged()
         graph.save_state()
 
-        # calculating optimal solution is done in a new thread so the game can continue
-        my_thread = threading.Thread(target=graph.calculate_solution)
-        my_thread.start()
+        # calculating optimal solution is done in a solver process so the game can continue
+        graph.calculate_solution()
         return graph
 
 
 class Graph:
     def __init__(self, size_factor, x, y, width, height, state_saving=False, easy_drawing=False):
         self.size_factor = size_factor
+        # the vertices and edges are stored in arrays, the Vertex, Edge and Group objects are views of their rows:
+        # vertex index -> position, initial position and id of its group, edge index -> vertex indices and weight
+        self.positions = numpy.zeros((0, 2), dtype=int)
+        self.init_positions = numpy.zeros((0, 2), dtype=int)
+        self.labels = numpy.zeros(0, dtype=int)
+        self.edge_vertices = numpy.zeros((0, 2), dtype=int)
+        self.edge_weights = numpy.zeros(0, dtype=int)
+        self._group_ids = itertools.count()
         self.groups = []
+        # vertex id -> vertex and vertex index -> vertex
         self.vertices = {}
+        self.vertex_list = []
         self.edges = []
+        # (vertex1 id, vertex2 id) -> index in self.edges, for both directions of an edge
+        self.edge_ids = {}
+        self._adjacency = None
+        # indices of the cut edges and the sum of their weights, updated whenever vertices change their group
+        self.cut_edge_ids = set()
+        self._score = 0
+        # group -> adjacent group -> (sum of the weights, number) of the edges between them and a max heap of the
+        # weights between groups (the score improvement of joining them), entries whose weight is outdated are
+        # discarded when they reach the top
+        self.group_weights = {}
+        self._joins = []
+        self._join_counter = itertools.count()
 
         self.surface = pygame.Surface((width, height))
         self.surface.set_colorkey(COLOR_KEY)
+        # everything except the moving group while a group is moved, with the state it was drawn from
+        self._static_layer = None
+        self._static_layer_state = None
         self.rec = pygame.Rect(x, y, width, height)
         self.optimal_score = None
         self.optimal_edge_set = None
+        self.heuristic_score = None
+        self.heuristic_edge_set = None
+        # the best known solution while the solver runs, or its result if the time limit was reached before it was
+        # proven to be optimal
+        self.best_score = None
+        self.best_edge_set = None
+        self.best_bound = None
+        self.best_gap = None
+        self.solving_time = None
+        self.solution_future = None
         self.optimal_groups = None
         self.vertices_color = None
         self.easy_drawing = easy_drawing
         self.state_saving = state_saving
-        self.prev_state = None
         self._has_changed = False
+        # undo journal, a step holds the groups before and after it and the states before and after it of the vertices
+        # and groups it changed, the state of a vertex or group is recorded when it changes for the first time since
+        # the last saved state
+        self._undo_steps = collections.deque(maxlen=constants.GRAPH_UNDO_STEPS)
+        self._redo_steps = []
+        self._saved_groups = []
+        self._changed_vertices = {}
+        self._changed_groups = {}
+        self.saved_score = 0
+        self.saved_best_score_improvement = 0
 
         self.deactivated = False
 
         self.draw()
 
+    @staticmethod
+    def from_arrays(size_factor, positions, edges, weights, vertex_ids=None, state_saving=False, easy_drawing=False):
+        # builds the whole graph at once and draws it only when it is complete, edges are pairs of vertex indices
+        # (rows of positions), the vertex ids are the indices if no ids are given
+        positions = numpy.asarray(positions, dtype=float).reshape(-1, 2)
+        edges = numpy.asarray(edges, dtype=int).reshape(-1, 2)
+        weights = numpy.asarray(weights) if len(weights) > 0 else numpy.zeros(0, dtype=int)
+        vertex_ids = list(range(len(positions)) if vertex_ids is None else vertex_ids)
+        if len(vertex_ids) != len(positions) or len(weights) != len(edges):
+            raise ValueError("every vertex needs a position and every edge a weight")
+
+        graph = Graph(size_factor, *(0, 0), *constants.GAME_MODE_BODY_SIZE, state_saving, easy_drawing)
+        graph.positions = numpy.round(positions).astype(int)
+        graph.init_positions = graph.positions.copy()
+        graph.labels = numpy.full(len(positions), -1)
+        graph.edge_vertices = edges
+        graph.edge_weights = weights
+
+        graph.vertex_list = [Vertex(graph, index, vertex_id) for index, vertex_id in enumerate(vertex_ids)]
+        graph.vertices = dict((vertex.id, vertex) for vertex in graph.vertex_list)
+        graph.groups = [vertex.group for vertex in graph.vertex_list]
+        graph._saved_groups = list(graph.groups)
+        graph.edges = [Edge(graph, index) for index in range(len(edges))]
+        for index, (vertex1, vertex2) in enumerate(edges.tolist()):
+            graph.edge_ids[(vertex_ids[vertex1], vertex_ids[vertex2])] = index
+            graph.edge_ids[(vertex_ids[vertex2], vertex_ids[vertex1])] = index
+        graph.calculate_edges()
+        graph.set_saved()
+
+        graph.draw()
+        return graph
+
     def get_best_score_improvement(self):
-        group_pairs = set()
-        for edge in self.edges:
-            if (edge.vertex1.group != edge.vertex2.group and
-                    not ((edge.vertex1.group, edge.vertex2.group) in group_pairs
-                         and (edge.vertex1.group, edge.vertex2.group) in group_pairs)):
-                group_pairs.add((edge.vertex1.group, edge.vertex2.group))
-
-        best_score = 0
-        for group1, group2 in group_pairs:
-            score = -self.get_weight_between_groups(group1, group2)
-            if score < best_score:
-                best_score = score
-        return best_score
+        best_join = self.get_best_join()
+        if best_join is None:
+            return 0
+        return -self.get_weight_between_groups(*best_join)
+
+    def get_best_join(self):
+        while len(self._joins) > 0:
+            weight, _, group1, group2 = self._joins[0]
+            if self.get_weight_between_groups(group1, group2) == -weight:
+                return group1, group2
+            heapq.heappop(self._joins)
+        return None
 
     def get_weight_between_groups(self, group1, group2):
-        score = 0
-        for vertex in group1.vertices.values():
-            for edge in vertex.edges.values():
-                if edge.vertex1.group == group2 or edge.vertex2.group == group2:
-                    score += edge.weight
-        return score
+        return self.group_weights.get(group1, {}).get(group2, (0, 0))[0]
+
+    def add_weight_between_groups(self, group1, group2, weight, count):
+        for group, other_group in ((group1, group2), (group2, group1)):
+            weights = self.group_weights.setdefault(group, {})
+            total_weight, total_count = weights.get(other_group, (0, 0))
+            if total_count + count == 0:
+                weights.pop(other_group, None)
+                if len(weights) == 0:
+                    self.group_weights.pop(group)
+            else:
+                weights[other_group] = (total_weight + weight, total_count + count)
+
+    def push_join(self, group1, group2):
+        # only joins that improve the score are of interest
+        weight = self.get_weight_between_groups(group1, group2)
+        if weight > 0:
+            heapq.heappush(self._joins, (-weight, next(self._join_counter), group1, group2))
+
+    def change_vertex(self, vertex):
+        # records the state of a vertex before its first change since the last saved state
+        if vertex.index not in self._changed_vertices:
+            self._changed_vertices[vertex.index] = (vertex.pos, vertex.group)
+
+    def change_group(self, group):
+        # records the state of a group and its vertices before their first change since the last saved state
+        if group not in self._changed_groups:
+            self._changed_groups[group] = (group.pos, group.init_pos, dict(group.vertices))
+            for vertex in group.vertices.values():
+                self.change_vertex(vertex)
 
     def save_state(self):
-        self.prev_state = copy.copy(self)
+        # the changes since the last saved state become one undo step, unless nothing is different in the end
+        vertex_states = {}
+        for index, state in self._changed_vertices.items():
+            vertex = self.vertex_list[index]
+            if state != (vertex.pos, vertex.group):
+                vertex_states[index] = (state, (vertex.pos, vertex.group))
+        group_states = {}
+        for group in set(self._changed_groups.keys()) | set(state[1][1] for state in vertex_states.values()):
+            state = self._changed_groups.get(group)
+            # the order of the vertices of a group is compared as well, it decides the layout of the group
+            if (state is None or state[:2] != (group.pos, group.init_pos)
+                    or list(state[2].items()) != list(group.vertices.items())):
+                group_states[group] = (state, (group.pos, group.init_pos, dict(group.vertices)))
+
+        if len(vertex_states) > 0 or len(group_states) > 0 or self.groups != self._saved_groups:
+            self._undo_steps.append((self._saved_groups, list(self.groups), vertex_states, group_states))
+            self._redo_steps = []
+        self.set_saved()
+
+    def set_saved(self):
+        self._saved_groups = list(self.groups)
+        self._changed_vertices = {}
+        self._changed_groups = {}
+        self.saved_score = self.get_score()
+        self.saved_best_score_improvement = self.get_best_score_improvement()
+
+    def restore_state(self):
+        # reverts the changes since the last saved state
+        self.apply_state(self._saved_groups, self._changed_vertices, self._changed_groups)
+        self.set_saved()
+        self._has_changed = False
+
+    def undo(self):
+        self.save_state()
+        if len(self._undo_steps) == 0:
+            return False
+        step = self._undo_steps.pop()
+        groups, _, vertex_states, group_states = step
+        self.apply_state(groups, dict((index, state[0]) for index, state in vertex_states.items()),
+                         dict((group, state[0]) for group, state in group_states.items() if state[0] is not None))
+        self._redo_steps.append(step)
+        self.set_saved()
+        self._has_changed = True
+        return True
+
+    def redo(self):
+        self.save_state()
+        if len(self._redo_steps) == 0:
+            return False
+        step = self._redo_steps.pop()
+        _, groups, vertex_states, group_states = step
+        self.apply_state(groups, dict((index, state[1]) for index, state in vertex_states.items()),
+                         dict((group, state[1]) for group, state in group_states.items()))
+        self._undo_steps.append(step)
+        self.set_saved()
+        self._has_changed = True
+        return True
+
+    def apply_state(self, groups, vertex_states, group_states):
+        # vertex index -> (position, group) and group -> (position, initial position, vertices)
+        self.groups = list(groups)
+        for group, (pos, init_pos, vertices) in group_states.items():
+            group.pos, group.init_pos, group.vertices = pos, init_pos, dict(vertices)
+
+        old_groups = {}
+        for index, (pos, group) in vertex_states.items():
+            vertex = self.vertex_list[index]
+            old_groups[vertex] = vertex.group
+            self.positions[index] = pos
+            vertex.group = group
+        self.update_edges(old_groups)
 
     @property
     def has_changed(self):
@@ -284,12 +434,17 @@ class Graph:
 
     def get_collided_vertex(self, vertex1):
         radius = constants.GRAPH_GROUP_RADIUS * 2 * self.size_factor
-        for vertex2 in self.vertices.values():
-            if vertex2 == vertex1:
-                continue
-            if utils.get_distance(vertex1.pos, vertex2.pos) < radius:
-                return vertex2
-        return None
+        hits = self.get_distances(vertex1.pos) < radius
+        hits[vertex1.index] = False
+        return self.vertex_list[hits.argmax()] if hits.any() else None
+
+    def get_hit_vertex(self, pos):
+        hits = self.get_distances(pos) < round(constants.GRAPH_VERTEX_RADIUS * self.size_factor)
+        return self.vertex_list[hits.argmax()] if hits.any() else None
+
+    def get_distances(self, pos, indices=None):
+        positions = self.positions if indices is None else self.positions[indices]
+        return numpy.hypot(positions[:, 0] - pos[0], positions[:, 1] - pos[1])
 
     def get_collided_group(self, pos, except_group=None):
         # reversed because last groups are drawn on top and should hit first
@@ -298,38 +453,122 @@ class Graph:
                 return group
         return None
 
-    def get_groups_by_cut(self, multicut):
-        groups = []
-        for vertex in self.vertices.values():
-            vertex_was_added = False
-            for vertex_list_group in groups:
-                if vertex in vertex_list_group:
-                    vertex_was_added = True
-                    break
+    def get_labels_by_cut(self, multicut):
+        # vertex id -> label, vertices that are connected by edges that are not in the multicut have the same label, the
+        # labels are numbered from 0 in the order of the vertices so they can be used as indices
+        multicut = set(multicut)
+        union_find = UnionFind(self.vertices.keys())
+        for edge in self.edges:
+            if edge.tuple not in multicut:
+                union_find.union(edge.vertex1.id, edge.vertex2.id)
 
-            if vertex_was_added:
-                continue
-            groups.append(self.get_group_by_cut(vertex, multicut))
+        labels = {}
+        root_labels = {}
+        for vertex_id in self.vertices.keys():
+            labels[vertex_id] = root_labels.setdefault(union_find.find(vertex_id), len(root_labels))
+        return labels
+
+    def get_groups_by_labels(self, labels):
+        groups = []
+        for vertex_id, label in labels.items():
+            if label == len(groups):
+                groups.append([])
+            groups[label].append(self.vertices[vertex_id])
         return groups
 
-    def get_group_by_cut(self, vertex, multicut):
-        vertices = [vertex]
-        i = 0
-        while i < len(vertices):
-            vertices.extend([v for v in self.get_connected_vertices(vertices[i], multicut) if v not in vertices])
-            i += 1
-        return vertices
+    def get_groups_by_cut(self, multicut):
+        return self.get_groups_by_labels(self.get_labels_by_cut(multicut))
+
+    def get_adjacency(self):
+        # CSR neighbour arrays, the vertex with index i is connected to the vertices with the indices
+        # neighbours[offsets[i]:offsets[i + 1]] by the edges edge_ids[offsets[i]:offsets[i + 1]] (indices in self.edges
+        # in ascending order), the arrays are rebuilt after vertices or edges were added
+        if self._adjacency is None:
+            sources = numpy.concatenate((self.edge_vertices[:, 0], self.edge_vertices[:, 1]))
+            targets = numpy.concatenate((self.edge_vertices[:, 1], self.edge_vertices[:, 0]))
+            edge_ids = numpy.tile(numpy.arange(len(self.edges)), 2)
+            order = numpy.lexsort((edge_ids, sources))
+            offsets = numpy.concatenate(([0], numpy.cumsum(numpy.bincount(sources, minlength=len(self.vertex_list)))))
+            self._adjacency = (offsets, targets[order], edge_ids[order])
+        return self._adjacency
+
+    def get_incident_edge_ids(self, indices):
+        # the indices of the edges of the vertices with the given indices, an edge between two of the vertices is
+        # contained twice
+        offsets, _, edge_ids = self.get_adjacency()
+        indices = numpy.asarray(indices, dtype=int)
+        starts = offsets[indices]
+        counts = offsets[indices + 1] - starts
+        return edge_ids[numpy.repeat(starts - numpy.cumsum(counts) + counts, counts) + numpy.arange(counts.sum())]
+
+    def get_edge(self, vertex1_id, vertex2_id):
+        edge_id = self.edge_ids.get((vertex1_id, vertex2_id))
+        return None if edge_id is None else self.edges[edge_id]
+
+    def get_components_without(self, group, vertex):
+        # the connected parts of a group without the vertex in the order of the group vertices, only the group is
+        # searched: a search starts from every neighbour of the vertex in the group, searches that meet are joined and
+        # the searching stops once at most one search can still grow, every finished search is a part that is split
+        # off and the remaining vertices are the last part
+        offsets, neighbours, _ = self.get_adjacency()
+
+        def is_searched(index):
+            return index != vertex.index and self.labels[index] == group.id
+
+        union_find = UnionFind()
+        owners = {}
+        queues = {}
+        members = {}
+        for start in neighbours[offsets[vertex.index]:offsets[vertex.index + 1]].tolist():
+            if is_searched(start) and start not in owners:
+                union_find.add(start)
+                owners[start] = start
+                queues[start] = collections.deque([start])
+                members[start] = [start]
+
+        finished = []
+        while len(queues) > 1:
+            for search in list(queues.keys()):
+                if search not in queues or len(queues) <= 1:
+                    continue
+                if len(queues[search]) == 0:
+                    queues.pop(search)
+                    finished.append(members.pop(search))
+                    continue
 
-    def get_connected_vertices(self, vertex, multicut):
-        connected_vertices = []
-        for edge in self.edges:
-            if edge.tuple in multicut:
-                continue
-            if edge.vertex1 == vertex:
-                connected_vertices.append(edge.vertex2)
-            if edge.vertex2 == vertex:
-                connected_vertices.append(edge.vertex1)
-        return connected_vertices
+                current = queues[search].popleft()
+                for neighbour in neighbours[offsets[current]:offsets[current + 1]].tolist():
+                    if not is_searched(neighbour):
+                        continue
+                    if neighbour not in owners:
+                        owners[neighbour] = search
+                        queues[search].append(neighbour)
+                        members[search].append(neighbour)
+                        continue
+                    other = union_find.find(owners[neighbour])
+                    if other != search:
+                        # the searches met, the shorter queue and member list are appended to the longer ones
+                        root = union_find.union(search, other)
+                        queue1, queue2 = sorted((queues.pop(search), queues.pop(other)), key=len, reverse=True)
+                        queue1.extend(queue2)
+                        members1, members2 = sorted((members.pop(search), members.pop(other)), key=len, reverse=True)
+                        members1.extend(members2)
+                        queues[root], members[root] = queue1, members1
+                        search = root
+
+        parts = {}
+        part_by_index = dict((index, part) for part, indices in enumerate(finished) for index in indices)
+        for group_vertex in group.vertices.values():
+            if group_vertex != vertex:
+                parts.setdefault(part_by_index.get(group_vertex.index, -1), []).append(group_vertex)
+        return list(parts.values())
+
+    def is_group_adjacent(self, group1, group2):
+        # only the neighbours of the smaller group are checked
+        if len(group1.vertices) > len(group2.vertices):
+            group1, group2 = group2, group1
+        edge_ids = self.get_incident_edge_ids(group1.get_indices())
+        return bool(numpy.any(self.labels[self.edge_vertices[edge_ids]] == group2.id))
 
     def group_overlap(self, group1):
         for group2 in self.groups:
@@ -341,24 +580,82 @@ class Graph:
                         return group2
         return None
 
+    def set_edge_cut(self, edge_id, is_cut):
+        if is_cut and edge_id not in self.cut_edge_ids:
+            self.cut_edge_ids.add(edge_id)
+            self._score += self.edge_weights[edge_id].item()
+        elif not is_cut and edge_id in self.cut_edge_ids:
+            self.cut_edge_ids.remove(edge_id)
+            self._score -= self.edge_weights[edge_id].item()
+
+    def update_edges(self, old_groups):
+        # old_groups is vertex -> group before the vertex changed its group, only the edges of these vertices can be cut
+        # or joined, so the cut edges, the score and the weights between groups are only updated for them
+        edge_ids = set(self.get_incident_edge_ids([vertex.index for vertex in old_groups]).tolist())
+        changed_pairs = set()
+        for edge_id in edge_ids:
+            edge = self.edges[edge_id]
+            old_group1 = old_groups.get(edge.vertex1, edge.vertex1.group)
+            old_group2 = old_groups.get(edge.vertex2, edge.vertex2.group)
+            if old_group1 == edge.vertex1.group and old_group2 == edge.vertex2.group:
+                continue
+            if old_group1 != old_group2:
+                # removing a negative edge also improves joining the old groups
+                self.add_weight_between_groups(old_group1, old_group2, -edge.weight, -1)
+                changed_pairs.add((old_group1, old_group2))
+            if edge.is_cut():
+                self.add_weight_between_groups(edge.vertex1.group, edge.vertex2.group, edge.weight, 1)
+                changed_pairs.add((edge.vertex1.group, edge.vertex2.group))
+            self.set_edge_cut(edge_id, edge.is_cut())
+
+        for group1, group2 in changed_pairs:
+            self.push_join(group1, group2)
+        # outdated entries are only discarded at the top, so the heap is rebuilt before it grows beyond the number of
+        # edges, which bounds the number of pairs of adjacent groups
+        if len(self._joins) > 2 * len(self.edges) + 16:
+            self.calculate_joins()
+
+    def calculate_edges(self):
+        is_cut = self.labels[self.edge_vertices[:, 0]] != self.labels[self.edge_vertices[:, 1]]
+        self.cut_edge_ids = set(numpy.flatnonzero(is_cut).tolist())
+        self._score = self.edge_weights[is_cut].sum().item()
+
+        self.group_weights = {}
+        for edge_id in self.cut_edge_ids:
+            edge = self.edges[edge_id]
+            self.add_weight_between_groups(edge.vertex1.group, edge.vertex2.group, edge.weight, 1)
+        self.calculate_joins()
+
+    def calculate_joins(self):
+        self._joins = []
+        for group1, weights in self.group_weights.items():
+            for group2 in weights.keys():
+                if id(group1) < id(group2):
+                    self.push_join(group1, group2)
+
     def merge_groups(self, group1, group2):
-        connected = False
-        for edge in self.edges:
-            if (edge.vertex1.group == group1 and edge.vertex2.group == group2) or (
-                    edge.vertex1.group == group2 and edge.vertex2.group == group1):
-                connected = True
-                break
-        if not connected:
+        if not self.is_group_adjacent(group1, group2):
             return
 
+        self.change_group(group1)
+        self.change_group(group2)
+        old_groups = dict((vertex, group1) for vertex in group1.vertices.values())
         for vertex in list(group1.vertices.values()):
             vertex.group = group2
             group2.add_vertex(vertex)
+        self.update_edges(old_groups)
 
         group2.calculate_pos()
         self.groups.remove(group1)
         self._has_changed = True
 
+    def get_partition(self):
+        partition = {}
+        for label, group in enumerate(self.groups):
+            for vertex_id in group.vertices.keys():
+                partition[vertex_id] = label
+        return partition
+
     def get_nx_graph(self):
         graph = nx.Graph()
         graph.add_nodes_from([v.id for v in self.vertices.values()])
@@ -366,20 +663,28 @@ class Graph:
         return graph
 
     def reset(self):
+        for group in self.groups:
+            self.change_group(group)
         self.groups = []
+        self.positions = self.init_positions.copy()
         for vertex in self.vertices.values():
             vertex.reset()
             self.groups.append(vertex.group)
+        self.calculate_edges()
         self.save_state()
         self.deactivated = False
 
     def reset_to_one_group(self):
-        group = Group(self.size_factor, list(self.vertices.values())[0])
+        for group in self.groups:
+            self.change_group(group)
+        group = Group(self.vertex_list[0])
         self.groups = [group]
         for vertex in self.vertices.values():
             group.add_vertex(vertex)
             vertex.group = group
 
+        self.calculate_edges()
+
         group.init_pos = self.rec.center
         group.pos = self.rec.center
         group.calculate_pos()
@@ -388,41 +693,67 @@ class Graph:
 
     def cut(self, edge_set):
         edge_set = [e for e in edge_set if not e.is_cut()]
-        cut_edges = [e for e in self.edges if e.is_cut()]
-        cut_edges.extend(edge_set)
-        cut_edges_tuples = [edge.tuple for edge in cut_edges]
         # validate cut
         if len(edge_set) == 0:
             return False
+        # only the groups of the cut edges change, their parts are labelled in one pass over the edges inside these
+        # groups and every cut edge has to end up between two parts
+        relevant_groups = set([vertex.group for edge in edge_set for vertex in (edge.vertex1, edge.vertex2)])
+        indices = numpy.sort(numpy.concatenate([group.get_indices() for group in relevant_groups]))
+        edge_ids = numpy.unique(self.get_incident_edge_ids(indices))
+        edge_labels = self.labels[self.edge_vertices[edge_ids]]
+        edge_ids = edge_ids[(edge_labels[:, 0] == edge_labels[:, 1])
+                            & ~numpy.isin(edge_ids, [edge.index for edge in edge_set])]
+        union_find = UnionFind(indices.tolist())
+        for vertex1, vertex2 in self.edge_vertices[edge_ids].tolist():
+            union_find.union(vertex1, vertex2)
         for edge in edge_set:
-            if edge.vertex1 in self.get_group_by_cut(edge.vertex2, cut_edges_tuples):
+            if union_find.connected(edge.vertex1.index, edge.vertex2.index):
                 return False
 
         # make cut
-        groups = self.get_groups_by_cut(cut_edges_tuples)
-
-        relevant_vertices = set([vertex for edge in edge_set for vertex in (edge.vertex1, edge.vertex2)])
-        old_group_center_pos_by_vertex = dict([(vertex.id, vertex.group.get_center()) for vertex in relevant_vertices])
-        old_group_center_pos_by_group = {}
-        old_group_total_nodes_by_vertex = dict(
-            [(vertex.id, len(vertex.group.vertices)) for vertex in relevant_vertices])
-        old_group_total_nodes_by_group = {}
-
-        for vertex in relevant_vertices:
-            for group in groups:
-                if vertex not in group:
-                    continue
-                old_group = vertex.group
-                new_group = Group(self.size_factor, vertex)
-                self.groups.append(new_group)
-                if old_group in self.groups:
-                    self.groups.remove(old_group)
-                for group_vertex in group:
-                    new_group.add_vertex(group_vertex)
-                    group_vertex.group = new_group
-                old_group_center_pos_by_group[new_group] = old_group_center_pos_by_vertex[vertex.id]
-                old_group_total_nodes_by_group[new_group] = old_group_total_nodes_by_vertex[vertex.id]
-                groups.remove(group)
+        parts = {}
+        for index in indices.tolist():
+            parts.setdefault(union_find.find(index), []).append(self.vertex_list[index])
+
+        for group in relevant_groups:
+            self.change_group(group)
+        old_group_center_pos_by_group = dict([(group, group.get_center()) for group in relevant_groups])
+        old_group_total_nodes_by_group = dict([(group, len(group.vertices)) for group in relevant_groups])
+
+        # the largest part of a group stays in the group, only the other parts become new groups
+        kept_parts = {}
+        for part, part_vertices in parts.items():
+            group = part_vertices[0].group
+            if len(part_vertices) > len(parts[kept_parts.setdefault(group, part)]):
+                kept_parts[group] = part
+
+        old_groups = {}
+        split_parts = set(kept_parts.values())
+        for vertex in dict.fromkeys(vertex for edge in edge_set for vertex in (edge.vertex1, edge.vertex2)):
+            # the group of a part is only created once, even if several cut edges end in it
+            part = union_find.find(vertex.index)
+            if part in split_parts:
+                continue
+            split_parts.add(part)
+            old_group = vertex.group
+            new_group = Group(vertex)
+            self.groups.append(new_group)
+            for group_vertex in parts[part]:
+                old_groups[group_vertex] = old_group
+                old_group.vertices.pop(group_vertex.id)
+                new_group.add_vertex(group_vertex)
+                group_vertex.group = new_group
+            old_group_center_pos_by_group[new_group] = old_group_center_pos_by_group[old_group]
+            old_group_total_nodes_by_group[new_group] = old_group_total_nodes_by_group[old_group]
+
+        for group in relevant_groups:
+            if len(group.vertices) == 1:
+                vertex = next(iter(group.vertices.values()))
+                group.pos = vertex.pos
+                group.init_pos = vertex.init_pos
+
+        self.update_edges(old_groups)
 
         if constants.CUT_AUTO_GAP:
             for group, old_center in old_group_center_pos_by_group.items():
@@ -434,19 +765,36 @@ class Graph:
 
         self._has_changed = True
 
-    def add_vertex(self, vertex):
-        self.vertices[vertex.id] = vertex
+    def add_vertex(self, vertex_id, pos):
+        pos = (round(pos[0]), round(pos[1]))
+        self.positions = numpy.concatenate((self.positions, [pos]))
+        self.init_positions = numpy.concatenate((self.init_positions, [pos]))
+        self.labels = numpy.append(self.labels, -1)
+        vertex = Vertex(self, len(self.vertex_list), vertex_id)
+        self.vertices[vertex_id] = vertex
+        self.vertex_list.append(vertex)
         self.groups.append(vertex.group)
-        self.draw()
+        # adding vertices can not be undone
+        self._saved_groups.append(vertex.group)
+        self._adjacency = None
+        return vertex
 
     def add_edge(self, vertex1_id, vertex2_id, weight=-1):
         vertex1 = self.vertices[vertex1_id]
         vertex2 = self.vertices[vertex2_id]
-        edge = Edge(vertex1, vertex2, weight)
+        # integer weights stay integers, the weights become floats with the first float weight
+        self.edge_vertices = numpy.concatenate((self.edge_vertices, [(vertex1.index, vertex2.index)]))
+        self.edge_weights = numpy.append(self.edge_weights.astype(numpy.result_type(self.edge_weights, weight)), weight)
+        edge = Edge(self, len(self.edges))
+        self.edge_ids[(vertex1_id, vertex2_id)] = len(self.edges)
+        self.edge_ids[(vertex2_id, vertex1_id)] = len(self.edges)
         self.edges.append(edge)
-        vertex1.add_edge(vertex2_id, edge)
-        vertex2.add_edge(vertex1_id, edge)
-        self.draw()
+        self.set_edge_cut(len(self.edges) - 1, edge.is_cut())
+        if edge.is_cut():
+            self.add_weight_between_groups(vertex1.group, vertex2.group, weight, 1)
+            self.push_join(vertex1.group, vertex2.group)
+        self._adjacency = None
+        return edge
 
     def get_vertex(self, vertex_id):
         return self.vertices.get(vertex_id)
@@ -455,7 +803,7 @@ class Graph:
         if group is not None:
             # a vertex should not be moved to a group it is not connected to the group
             connected = False
-            for edge in vertex.edges.values():
+            for edge in vertex.get_edges():
                 if edge.vertex1 == vertex and edge.vertex2.group == group:
                     connected = True
                     break
@@ -465,54 +813,81 @@ class Graph:
             if not connected:
                 return
 
-        # create the future multicut to check if new groups need to be created
-        new_multicut = self.get_multicut()
-        for edge in vertex.edges.values():
-            if edge.vertex1 == vertex:
-                if edge.vertex2.group != group:
-                    new_multicut.append(edge.tuple)
-                else:
-                    new_multicut.remove(edge.tuple)
-            if edge.vertex2 == vertex:
-                if edge.vertex1.group != group:
-                    new_multicut.append(edge.tuple)
-                else:
-                    new_multicut.remove(edge.tuple)
-
         group_old = vertex.group
+        self.change_group(group_old)
+        if group is not None:
+            self.change_group(group)
+        old_groups = {vertex: group_old}
         group_old.remove_vertex(vertex)
         if len(group_old.vertices) == 0:
             self.groups.remove(group_old)
-        elif len(group_old.vertices.values()) != len(
-                self.get_group_by_cut(list(group_old.vertices.values())[0], new_multicut)):
-            # if the vertices from the old group are not connected anymore after removing the vertex, the group needs
-            # to be split up into new groups
-            left_over_vertices = set(group_old.vertices.values())
-            self.groups.remove(group_old)
-            while len(left_over_vertices) > 0:
-                new_vertex = left_over_vertices.pop()
-                connected_vertices = self.get_group_by_cut(new_vertex, new_multicut)
-                new_group = Group(self.size_factor, new_vertex)
-                for connected_vertex in connected_vertices:
-                    connected_vertex.group = new_group
-                    new_group.add_vertex(connected_vertex)
-                self.groups.append(new_group)
-                new_group.calculate_pos()
-                left_over_vertices.difference_update(set(connected_vertices))
+        else:
+            components = self.get_components_without(group_old, vertex)
+            if len(components) > 1:
+                # if the vertices from the old group are not connected anymore after removing the vertex, the group
+                # needs to be split up into new groups
+                self.groups.remove(group_old)
+                for connected_vertices in components:
+                    new_group = Group(connected_vertices[0])
+                    for connected_vertex in connected_vertices:
+                        old_groups[connected_vertex] = group_old
+                        connected_vertex.group = new_group
+                        new_group.add_vertex(connected_vertex)
+                    self.groups.append(new_group)
+                    new_group.calculate_pos()
 
         if group is None:
-            group = Group(self.size_factor, vertex)
+            group = Group(vertex)
             self.groups.append(group)
 
         vertex.group = group
         group.add_vertex(vertex)
         group.calculate_pos()
+        self.update_edges(old_groups)
         self._has_changed = True
 
     def calculate_solution(self):
-        self.optimal_edge_set, self.optimal_score = multicut_ilp(self.get_nx_graph())
+        vertices = list(self.vertices.keys())
+        edges = [(edge.vertex1.id, edge.vertex2.id, edge.weight) for edge in self.edges]
+        self.solution_future = solver_service.submit(vertices, edges, self.set_heuristic_solution,
+                                                     self.get_partition(), self.set_solution_progress,
+                                                     constants.SOLVER_TIME_LIMIT)
+        self.solution_future.add_done_callback(self.solution_calculated)
+
+    def cancel_solution(self):
+        if self.solution_future is not None:
+            solver_service.cancel(self.solution_future)
+
+    def solution_calculated(self, future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.set_solution(*future.result())
+        self.post_solver_event()
+
+    def set_heuristic_solution(self, edge_set, score):
+        self.heuristic_edge_set, self.heuristic_score = edge_set, score
+        self.post_solver_event()
+
+    def set_solution_progress(self, score, bound, gap, solving_time):
+        self.best_score, self.best_bound, self.best_gap, self.solving_time = score, bound, gap, solving_time
+        self.post_solver_event()
 
-        optimal_groups = self.get_groups_by_cut(self.optimal_edge_set)
+    @staticmethod
+    def post_solver_event():
+        # the solver results arrive in the thread of the solver service, the event wakes up the game if it waits for
+        # events
+        if pygame.display.get_init():
+            pygame.event.post(pygame.event.Event(SOLVER_EVENT))
+
+    def set_solution(self, edge_set, score, optimal=True):
+        # only a solution that is proven to be optimal is a score the player has to reach, otherwise it is only shown
+        # as the best known solution
+        if optimal:
+            self.optimal_edge_set, self.optimal_score = edge_set, score
+        else:
+            self.best_edge_set, self.best_score = edge_set, score
+
+        optimal_groups = self.get_groups_by_cut(edge_set)
 
         self.vertices_color = {}
         colors = set(generate_distinct_colors(len(optimal_groups)))
@@ -521,15 +896,8 @@ class Graph:
             for vertex in group:
                 self.vertices_color[vertex.id] = color
 
-        if self.state_saving:
-            self.save_state()
-
     def get_score(self):
-        score = 0
-        for edge in self.edges:
-            if edge.vertex1.group != edge.vertex2.group:
-                score += edge.weight
-        return score
+        return self._score
 
     def get_intersected_edges(self, point1, point2):
         intersected_edges = []
@@ -538,72 +906,110 @@ class Graph:
                 intersected_edges.append(edge)
         return intersected_edges
 
+    def get_target_score(self):
+        # the score the player has to reach, the best known score if the time limit was reached before the solver
+        # proved a solution to be optimal
+        if self.optimal_score is not None:
+            return self.optimal_score
+        if self.best_edge_set is not None:
+            return self.best_score
+        return None
+
     def is_solved(self):
-        return self.optimal_score is not None and self.optimal_score == self.get_score()
+        target_score = self.get_target_score()
+        return target_score is not None and self.get_score() <= target_score
+
+    def draw(self, highlight_group=None, show_solution=False, moving_group=None):
+        if moving_group is None:
+            self.draw_layer(self.surface, highlight_group, show_solution)
+            return
 
-    def draw(self, highlight_group=None, show_solution=False):
-        self.surface.fill(COLOR_KEY)
+        # while a group is moved everything else is drawn only once into the static layer, it is drawn again when the
+        # partition, the position of a vertex outside of the moving group or the way the graph is drawn changed
+        is_static = self.labels != moving_group.id
+        key = (moving_group, highlight_group, show_solution, self.vertices_color, [group.id for group in self.groups])
+        if (self._static_layer_state is None or self._static_layer_state[0] != key
+                or not numpy.array_equal(self._static_layer_state[1], self.labels)
+                or not numpy.array_equal(self._static_layer_state[2][is_static], self.positions[is_static])):
+            if self._static_layer is None:
+                self._static_layer = pygame.Surface(self.surface.get_size())
+            self.draw_layer(self._static_layer, highlight_group, show_solution, moving_group, False)
+            self._static_layer_state = (key, self.labels.copy(), self.positions.copy())
+
+        self.surface.blit(self._static_layer, (0, 0))
+        self.draw_layer(self.surface, highlight_group, show_solution, moving_group, True)
+
+    def draw_layer(self, surface, highlight_group=None, show_solution=False, moving_group=None, moving=False):
+        # without a moving group the whole graph is drawn, otherwise only the moving group with its vertices and edges
+        # or only everything else
+        groups = self.groups
+        draw_vertices = numpy.ones(len(self.vertex_list), dtype=bool)
+        draw_edges = numpy.ones(len(self.edges), dtype=bool)
+        if moving_group is not None:
+            draw_vertices = (self.labels == moving_group.id) == moving
+            draw_edges = ((self.labels[self.edge_vertices[:, 0]] == moving_group.id)
+                          | (self.labels[self.edge_vertices[:, 1]] == moving_group.id)) == moving
+            groups = [group for group in self.groups if (group == moving_group) == moving]
+        if not moving:
+            surface.fill(COLOR_KEY)
 
         # draw groups
-        for group in self.groups:
-            group.draw(self.surface, group == highlight_group, self.easy_drawing)
+        for group in groups:
+            group.draw(surface, group == highlight_group, self.easy_drawing)
 
         # draw edges
-        for edge in self.edges:
-            edge.draw(self.surface)
+        positions = self.positions.tolist()
+        is_cut = self.labels[self.edge_vertices[:, 0]] != self.labels[self.edge_vertices[:, 1]]
+        for (vertex1, vertex2), weight, edge_is_cut in zip(self.edge_vertices[draw_edges].tolist(),
+                                                           self.edge_weights[draw_edges].tolist(),
+                                                           is_cut[draw_edges].tolist()):
+            draw_line = draw_cut_thick_aaline if edge_is_cut else draw_thick_aaline
+            draw_line(surface, positions[vertex1], positions[vertex2], GREEN if weight == 1 else RED, 3)
 
         # draw vertices
-        for vertex in self.vertices.values():
-            color = self.vertices_color[vertex.id] if self.optimal_score is not None and show_solution else DARK_BLUE
-            vertex.draw(self.surface, color)
+        radius = round(constants.GRAPH_VERTEX_RADIUS * self.size_factor)
+        for index in numpy.flatnonzero(draw_vertices).tolist():
+            vertex, pos = self.vertex_list[index], positions[index]
+            color = self.vertices_color[vertex.id] if self.vertices_color is not None and show_solution else DARK_BLUE
+            gfxdraw.aacircle(surface, *pos, radius, color)
+            gfxdraw.filled_circle(surface, *pos, radius, color)
 
     def get_multicut(self):
-        multicut = []
-        for edge in self.edges:
-            if edge.is_cut():
-                multicut.append(edge.tuple)
-        return multicut
+        return [self.edges[edge_id].tuple for edge_id in sorted(self.cut_edge_ids)]
 
     def objects(self):
         return self.surface, self.rec
 
     def __copy__(self):
-        groups = dict(
-            {tuple(group.vertices.keys()): (group.pos, group.init_pos, group.radius) for group in self.groups})
-
-        vertices = dict({vertex.id: (vertex.pos, vertex.init_pos, vertex.radius) for vertex in self.vertices.values()})
-
-        edges = tuple(((edge.vertex1.id, edge.vertex2.id, edge.weight) for edge in self.edges))
-
-        graph = Graph(self.size_factor, *(0, 0), *constants.GAME_MODE_BODY_SIZE, self.state_saving)
+        graph = Graph.from_arrays(self.size_factor, self.positions, self.edge_vertices, self.edge_weights,
+                                  [vertex.id for vertex in self.vertex_list], self.state_saving, self.easy_drawing)
+        graph.init_positions = self.init_positions.copy()
 
-        for vertex_id, vertex_tuple in vertices.items():
-            vertex = Vertex(self.size_factor, vertex_id, vertex_tuple[0])
-            vertex.init_pos = vertex_tuple[1]
-            vertex.radius = vertex_tuple[2]
-            graph.add_vertex(vertex)
-
-        for edge_tuple in edges:
-            graph.add_edge(*edge_tuple)
-
-        for group_vertices, group_tuple in groups.items():
-            group = graph.get_vertex(group_vertices[0]).group
-            group.pos = group_tuple[0]
-            group.init_pos = group_tuple[1]
-            group.radius = group_tuple[2]
-            for vertex_id in group_vertices[1:]:
-                graph.move_vertex_to_group(graph.get_vertex(vertex_id), group)
+        graph.groups = []
+        for group in self.groups:
+            vertices = [graph.vertex_list[vertex.index] for vertex in group.vertices.values()]
+            new_group = Group(vertices[0])
+            new_group.pos = group.pos
+            new_group.init_pos = group.init_pos
+            new_group.radius = group.radius
+            for vertex in vertices:
+                new_group.add_vertex(vertex)
+                vertex.group = new_group
+            graph.groups.append(new_group)
+        graph.calculate_edges()
+        graph.set_saved()
+
+        graph.heuristic_score = self.heuristic_score
+        graph.heuristic_edge_set = self.heuristic_edge_set
+        graph.best_score = self.best_score
+        graph.best_bound = self.best_bound
+        graph.best_gap = self.best_gap
+        graph.solving_time = self.solving_time
 
         if self.optimal_score is not None:
-            graph.optimal_score = self.optimal_score
-            graph.optimal_edge_set = self.optimal_edge_set
-            optimal_groups = graph.get_groups_by_cut(graph.optimal_edge_set)
-            graph.vertices_color = {}
-            colors = set(generate_distinct_colors(len(optimal_groups)))
-            graph.optimal_groups = zip(colors, optimal_groups)
-            for color, group in graph.optimal_groups:
-                for vertex in group:
-                    graph.vertices_color[vertex.id] = color
+            graph.set_solution(self.optimal_edge_set, self.optimal_score)
+        elif self.best_edge_set is not None:
+            graph.set_solution(self.best_edge_set, self.best_score, False)
 
         graph.set_unchanged()
 
@@ -611,19 +1017,26 @@ class Graph:
 
 
 class Group:
-    def __init__(self, size_factor, vertex):
-        self.size_factor = size_factor
+    __slots__ = ('graph', 'id', 'vertices', 'init_pos', 'pos', 'polygon', 'polygons', 'radius')
+
+    def __init__(self, vertex):
+        self.graph = vertex.graph
+        # the label of the vertices of the group in graph.labels
+        self.id = next(self.graph._group_ids)
         self.vertices = {}
         self.init_pos = vertex.init_pos
         self.pos = vertex.pos
-        self.rel_pos = {}
         self.polygon = None
-        self.radius = round(constants.GRAPH_GROUP_RADIUS * self.size_factor)
+        # (vertex ids, layout relative to the first vertex, radius, easy drawing) -> outline relative to that vertex, the
+        # least recently used outlines are dropped first
+        self.polygons = collections.OrderedDict()
+        self.radius = round(constants.GRAPH_GROUP_RADIUS * self.graph.size_factor)
+
+    def get_indices(self):
+        return numpy.fromiter((vertex.index for vertex in self.vertices.values()), dtype=int, count=len(self.vertices))
 
     def get_center(self):
-        center_x = sum([vertex.pos[0] for vertex in self.vertices.values()]) / len(self.vertices)
-        center_y = sum([vertex.pos[1] for vertex in self.vertices.values()]) / len(self.vertices)
-        return center_x, center_y
+        return tuple(self.graph.positions[self.get_indices()].mean(axis=0).tolist())
 
     def add_vertex(self, vertex):
         if vertex.id not in self.vertices.keys():
@@ -644,12 +1057,10 @@ class Group:
             if polygon.contains(Point(*pos)):
                 return True
 
-        for vertex in self.vertices.values():
-            if vertex.is_hit(pos, True):
-                return True
-        return False
+        return bool(numpy.any(self.graph.get_distances(pos, self.get_indices()) < self.radius))
 
     def move(self, pos):
+        self.graph.change_group(self)
         self.pos = pos
         self.calculate_pos()
 
@@ -658,57 +1069,75 @@ class Group:
             pass
 
     def _calculate_pos(self):
-        self.rel_pos = {}
-
-        for vertex in self.vertices.values():
-            rel_pos = (numpy.array(vertex.init_pos) - self.init_pos) * 0.7
-            self.rel_pos[vertex] = rel_pos
-            total_pos = [round(n) for n in (numpy.array(self.pos) + self.rel_pos[vertex])]
-
-            vertex_out_of_bounds = False
-            left_bound = constants.GAME_MODE_BODY_MARGIN
-            right_bound = constants.GAME_MODE_BODY_SIZE[0] - constants.GAME_MODE_BODY_MARGIN
-            top_bound = constants.GAME_MODE_BODY_MARGIN
-            bottom_bound = constants.GAME_MODE_BODY_SIZE[1] - constants.GAME_MODE_BODY_MARGIN
+        # the vertices keep their initial layout relative to the group position, if a vertex would be out of bounds the
+        # group position is moved so that the first such vertex is inside and the positions are calculated again
+        indices = self.get_indices()
+        rel_pos = (self.graph.init_positions[indices] - self.init_pos) * 0.7
+        total_pos = numpy.round(numpy.array(self.pos) + rel_pos).astype(int)
+
+        left_bound = constants.GAME_MODE_BODY_MARGIN
+        right_bound = constants.GAME_MODE_BODY_SIZE[0] - constants.GAME_MODE_BODY_MARGIN
+        top_bound = constants.GAME_MODE_BODY_MARGIN
+        bottom_bound = constants.GAME_MODE_BODY_SIZE[1] - constants.GAME_MODE_BODY_MARGIN
+        out_of_bounds = ((total_pos[:, 0] < left_bound) | (total_pos[:, 0] > right_bound)
+                         | (total_pos[:, 1] < top_bound) | (total_pos[:, 1] > bottom_bound))
+        if out_of_bounds.any():
+            total_x, total_y = total_pos[out_of_bounds.argmax()].tolist()
             pos_update = list(self.pos)
-            if left_bound > total_pos[0]:
-                pos_update[0] = self.pos[0] + left_bound - total_pos[0]
-                vertex_out_of_bounds = True
-            if right_bound < total_pos[0]:
-                pos_update[0] = self.pos[0] + right_bound - total_pos[0]
-                vertex_out_of_bounds = True
-            if top_bound > total_pos[1]:
-                pos_update[1] = self.pos[1] + top_bound - total_pos[1]
-                vertex_out_of_bounds = True
-            if bottom_bound < total_pos[1]:
-                pos_update[1] = self.pos[1] + bottom_bound - total_pos[1]
-                vertex_out_of_bounds = True
-
-            total_pos = tuple(total_pos)
-
-            vertex.move(total_pos)
-            if vertex_out_of_bounds:
-                self.pos = tuple(pos_update)
-                return False
+            if left_bound > total_x:
+                pos_update[0] = self.pos[0] + left_bound - total_x
+            if right_bound < total_x:
+                pos_update[0] = self.pos[0] + right_bound - total_x
+            if top_bound > total_y:
+                pos_update[1] = self.pos[1] + top_bound - total_y
+            if bottom_bound < total_y:
+                pos_update[1] = self.pos[1] + bottom_bound - total_y
+            self.pos = tuple(pos_update)
+            return False
+
+        self.graph.positions[indices] = total_pos
+        if len(indices) == 1:
+            self.pos = tuple(total_pos[0].tolist())
         return True
 
+    def get_edges(self):
+        # the edges between vertices of the group as vertex id tuples
+        edge_ids = numpy.unique(self.graph.get_incident_edge_ids(self.get_indices()))
+        labels = self.graph.labels[self.graph.edge_vertices[edge_ids]]
+        return [self.graph.edges[edge_id].tuple for edge_id in edge_ids[(labels == self.id).all(axis=1)].tolist()]
+
+    def get_polygon(self, radius, easy_drawing=False):
+        # the outline only depends on the vertices and their layout relative to each other, so a moved group reuses the
+        # outline of its layout and only translates it to the position of its first vertex
+        positions = self.graph.positions[self.get_indices()]
+        offset = positions[0]
+        relative_positions = positions - offset
+        key = (tuple(self.vertices.keys()), relative_positions.tobytes(), radius, easy_drawing)
+        polygon = self.polygons.get(key)
+        if polygon is None:
+            vertices = dict(zip(self.vertices.keys(), map(tuple, relative_positions.tolist())))
+            polygon = calculate_polygon(vertices, self.get_edges(), radius, easy_drawing)
+            if len(self.polygons) >= constants.GRAPH_GROUP_POLYGON_CACHE_SIZE:
+                self.polygons.popitem(last=False)
+            self.polygons[key] = polygon
+        else:
+            self.polygons.move_to_end(key)
+
+        offset_x, offset_y = offset.tolist()
+        return tuple((x + offset_x, y + offset_y) for x, y in polygon)
+
     def draw(self, surface, highlight, easy_drawing=False):
         size_increase = 0
         if highlight:
             size_increase = 5
-        radius = round(self.radius + (size_increase * self.size_factor))
+        radius = round(self.radius + (size_increase * self.graph.size_factor))
 
         for vertex in self.vertices.values():
             gfxdraw.filled_circle(surface, *vertex.pos, radius, LIGHT_BLUE)
             gfxdraw.aacircle(surface, *vertex.pos, radius, LIGHT_BLUE)
 
         if len(self.vertices) > 1:
-            vertices = dict([(vertex.id, vertex.pos) for vertex in self.vertices.values()])
-            edges = list(set([edge.tuple for vertex in self.vertices.values() for edge in vertex.edges.values()]))
-            for edge in list(edges):
-                if edge[0] not in vertices.keys() or edge[1] not in vertices.keys():
-                    edges.remove(edge)
-            self.polygon = calculate_polygon(vertices, edges, radius, easy_drawing)
+            self.polygon = self.get_polygon(radius, easy_drawing)
 
             gfxdraw.filled_polygon(surface, self.polygon, LIGHT_BLUE)
             gfxdraw.aapolygon(surface, self.polygon, LIGHT_BLUE)
@@ -717,22 +1146,49 @@ class Group:
 
 
 class Vertex:
-    def __init__(self, size_factor, id, pos):
-        self.size_factor = size_factor
-        self.pos = (round(pos[0]), round(pos[1]))
-        self.init_pos = self.pos
-        self.radius = round(constants.GRAPH_VERTEX_RADIUS * self.size_factor)
+    __slots__ = ('graph', 'index', 'id', '_group')
+
+    def __init__(self, graph, index, id):
+        # a view of the row index of the vertex arrays of the graph
+        self.graph = graph
+        self.index = index
         self.id = id
-        self.edges = {}
-        self.group = Group(self.size_factor, self)
+        self.group = Group(self)
         self.group.add_vertex(self)
-        font = pygame.font.SysFont('Ariel', 20)
-        self.text_surface = font.render(str(self.id), True, colors.BLACK)
-        self.text_rec = self.text_surface.get_rect()
+
+    @property
+    def pos(self):
+        return tuple(self.graph.positions[self.index].tolist())
+
+    @property
+    def init_pos(self):
+        return tuple(self.graph.init_positions[self.index].tolist())
+
+    @init_pos.setter
+    def init_pos(self, pos):
+        self.graph.init_positions[self.index] = pos
+
+    @property
+    def group(self):
+        return self._group
+
+    @group.setter
+    def group(self, group):
+        self._group = group
+        self.graph.labels[self.index] = group.id
+
+    @property
+    def radius(self):
+        return round(constants.GRAPH_VERTEX_RADIUS * self.graph.size_factor)
+
+    @property
+    def edges(self):
+        # neighbour id -> edge
+        return dict((edge.vertex2.id if edge.vertex1 == self else edge.vertex1.id, edge) for edge in self.get_edges())
 
     def reset(self):
-        self.pos = self.init_pos
-        self.group = Group(self.size_factor, self)
+        self.graph.positions[self.index] = self.graph.init_positions[self.index]
+        self.group = Group(self)
         self.group.add_vertex(self)
 
     @property
@@ -747,46 +1203,48 @@ class Vertex:
             radius = self.group.radius
         return utils.get_distance(self.pos, pos) < radius
 
-    def draw(self, surface, color):
-        gfxdraw.aacircle(surface, *self.pos, self.radius, color)
-        gfxdraw.filled_circle(surface, *self.pos, self.radius, color)
-
-        # self.text_rec.center = self.pos
-        # surface.blit(self.text_surface, self.text_rec)
-
-    def add_edge(self, vertex_id, edge):
-        self.edges[vertex_id] = edge
-
     def get_edges(self):
-        return self.edges.values()
+        return [self.graph.edges[edge_id] for edge_id in self.graph.get_incident_edge_ids([self.index]).tolist()]
 
     def get_weight(self, vertex_id):
-        return self.edges[vertex_id].weight
+        return self.graph.get_edge(self.id, vertex_id).weight
 
     def move(self, pos):
+        self.graph.change_vertex(self)
+        if len(self.group.vertices) == 1:
+            self.graph.change_group(self.group)
         pos = (round(pos[0]), round(pos[1]))
-        self.pos = pos
+        self.graph.positions[self.index] = pos
         if len(self.group.vertices) == 1:
             self.group.pos = pos
 
 
 class Edge:
-    def __init__(self, vertex1, vertex2, weight):
-        self.weight = weight
-        self.vertex1 = vertex1
-        self.vertex2 = vertex2
-
-    def draw(self, surface):
-        if self.vertex1.group != self.vertex2.group:
-            draw_cut_thick_aaline(surface, self.vertex1.pos, self.vertex2.pos, GREEN if self.weight == 1 else RED, 3)
-        else:
-            draw_thick_aaline(surface, self.vertex1.pos, self.vertex2.pos, GREEN if self.weight == 1 else RED, 3)
+    __slots__ = ('graph', 'index')
+
+    def __init__(self, graph, index):
+        # a view of the row index of the edge arrays of the graph
+        self.graph = graph
+        self.index = index
+
+    @property
+    def vertex1(self):
+        return self.graph.vertex_list[self.graph.edge_vertices[self.index, 0]]
+
+    @property
+    def vertex2(self):
+        return self.graph.vertex_list[self.graph.edge_vertices[self.index, 1]]
+
+    @property
+    def weight(self):
+        return self.graph.edge_weights[self.index].item()
 
     def intersects(self, point1, point2):
         return line_line_intersect(point1, point2, self.vertex1.pos, self.vertex2.pos) is not None
 
     def is_cut(self):
-        return self.vertex1.group != self.vertex2.group
+        vertex1, vertex2 = self.graph.edge_vertices[self.index]
+        return bool(self.graph.labels[vertex1] != self.graph.labels[vertex2])
 
     @property
     def tuple(self):
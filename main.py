@@ -1,3 +1,5 @@
+import multiprocessing
+
 from multicut_game import MulticutGame
 
 
@@ -7,4 +9,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # the solver processes are started from the executable as well
+    multiprocessing.freeze_support()
     main()
@@ -1,4 +1,6 @@
+import math
 import sys
+import time
 from functools import partial
 
 import pygame
@@ -7,6 +9,7 @@ import colors
 import constants
 import utils
 from button import ActionButton
+from solver_service import solver_service
 from game_modes import ClassicGameMode, Tutorial, ImageSegmentation, GreedyJoining, GridGraphMode, CompleteGraphMode
 from utils import sub_pos
 
@@ -16,9 +19,7 @@ class MulticutGame:
         pygame.init()
         self.clock = pygame.time.Clock()
 
-        # Set up font
-        self.font = pygame.font.SysFont('Ariel', 32)
-        loading_text = self.font.render("Loading... Please wait!", True, colors.BLACK)
+        loading_text = utils.render_text("Loading... Please wait!", 32, colors.BLACK)
         loading_text_rec = loading_text.get_rect()
         loading_text_rec.center = utils.round_pos(utils.div_pos(constants.SCREEN_SIZE, (2, 2)))
 
@@ -33,6 +34,12 @@ class MulticutGame:
         self.surface.fill(colors.WHITE)
         pygame.display.update()
 
+        # the whole screen is drawn again after it changed its size or the game mode changed, otherwise only the
+        # regions that changed are drawn
+        self.draw_necessary = True
+        # the event that ended the last wait for events
+        self.waited_events = []
+
         # Set up buttons
         self.buttons = []
         self.current_game_mode = None
@@ -80,46 +87,107 @@ class MulticutGame:
         if game_mode is not None:
             self.game_modes[game_mode].switch_to()
         self.current_game_mode = game_mode
+        self.draw_necessary = True
 
     def run(self):
         while True:
-            self.surface.fill(colors.WHITE)
-
             screen_size_ratio = (
                 constants.SCREEN_SIZE[0] / self.screen_size[0], constants.SCREEN_SIZE[1] / self.screen_size[1])
 
             mouse_pos = utils.round_pos(utils.mult_pos(pygame.mouse.get_pos(), screen_size_ratio))
-            events = pygame.event.get()
+            events = self.waited_events + pygame.event.get()
+            self.waited_events = []
             # Handle events
             for event in events:
                 if event.type == pygame.QUIT:
                     self.quit()
                 elif event.type == pygame.VIDEORESIZE:
                     self.screen_size = event.dict['size']
+                    self.draw_necessary = True
+                elif event.type == pygame.VIDEOEXPOSE:
+                    # the window was covered, so the screen has to be drawn completely
+                    self.draw_necessary = True
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     for button in self.buttons:
                         if button.collides(mouse_pos):
                             button.action()
 
+            dirty_recs = []
+            if self.draw_necessary:
+                self.surface.fill(colors.WHITE)
+                # draw border
+                rec = pygame.Rect(sub_pos(constants.GAME_MODE_SCREEN_OFFSET, (2, 0)), (2, constants.SCREEN_SIZE[1]))
+                pygame.draw.rect(self.surface, colors.GREY, rec)
+                dirty_recs.append(self.surface.get_rect())
+
             # draw buttons
             for button in self.buttons:
                 button.hover(button.collides(mouse_pos))
-                self.surface.blit(*button.objects())
+                if button.draw_necessary or self.draw_necessary:
+                    self.surface.fill(colors.WHITE, button.rec)
+                    self.surface.blit(*button.objects())
+                    dirty_recs.append(button.rec)
 
             # run game mode
             if self.current_game_mode is not None:
                 game_mode = self.game_modes[self.current_game_mode]
                 game_mode.main(events, mouse_pos)
-                self.surface.blit(*game_mode.objects())
-
-            # draw border
-            rec = pygame.Rect(sub_pos(constants.GAME_MODE_SCREEN_OFFSET, (2, 0)), (2, constants.SCREEN_SIZE[1]))
-            pygame.draw.rect(self.surface, colors.GREY, rec)
+                game_mode_surface, game_mode_rec = game_mode.objects()
+                game_mode_dirty_recs = game_mode.get_dirty_recs()
+                for rec in [game_mode_rec] if self.draw_necessary else game_mode_dirty_recs:
+                    self.surface.fill(colors.WHITE, rec)
+                    self.surface.blit(game_mode_surface, rec, rec.move(-game_mode_rec.x, -game_mode_rec.y))
+                    dirty_recs.append(rec)
+
+            if self.draw_necessary:
+                self.draw_necessary = False
+                self.screen.blit(pygame.transform.scale(self.surface, self.screen_size), (0, 0))
+                pygame.display.update()
+            elif len(dirty_recs) != 0:
+                pygame.display.update(self.draw_on_screen(dirty_recs))
+
+            if len(events) == 0 and len(dirty_recs) == 0:
+                # nothing changed, so the game waits for the next event instead of drawing the same frame again
+                self.wait_for_event()
+            else:
+                self.clock.tick(constants.FRAMES_PER_SECOND)
+
+    def wait_for_event(self):
+        # solver results are posted as events, the wait ends early if the game mode changes by itself before
+        wait_time = constants.IDLE_WAIT_TIME
+        if self.current_game_mode is not None:
+            wake_up_time = self.game_modes[self.current_game_mode].get_wake_up_time()
+            if wake_up_time is not None:
+                wait_time = min(wait_time, round((wake_up_time - time.time()) * 1000))
 
-            self.screen.blit(pygame.transform.scale(self.surface, self.screen_size), (0, 0))
-            pygame.display.update()
+        if wait_time <= 0:
             self.clock.tick(constants.FRAMES_PER_SECOND)
+            return
+        event = pygame.event.wait(wait_time)
+        if event.type != pygame.NOEVENT:
+            self.waited_events.append(event)
+
+    def draw_on_screen(self, recs):
+        # copies regions of the surface to the screen and returns the regions of the screen
+        if self.screen_size == constants.SCREEN_SIZE:
+            for rec in recs:
+                self.screen.blit(self.surface, rec, rec)
+            return recs
+
+        # the whole surface is scaled, so the regions look the same as if the whole screen was drawn
+        scaled_surface = pygame.transform.scale(self.surface, self.screen_size)
+        scale_x = self.screen_size[0] / constants.SCREEN_SIZE[0]
+        scale_y = self.screen_size[1] / constants.SCREEN_SIZE[1]
+        screen_recs = []
+        for rec in recs:
+            left, top = math.floor(rec.left * scale_x), math.floor(rec.top * scale_y)
+            screen_rec = pygame.Rect(left, top, math.ceil(rec.right * scale_x) - left + 1,
+                                     math.ceil(rec.bottom * scale_y) - top + 1)
+            self.screen.blit(scaled_surface, screen_rec, screen_rec)
+            screen_recs.append(screen_rec)
+        return screen_recs
 
     def quit(self):
+        solver_service.shutdown()
         pygame.quit()
         sys.exit()
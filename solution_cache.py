@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+
+class SolutionCache:
+    def __init__(self, path, max_entries=1000):
+        self.path = path
+        self.max_entries = max_entries
+
+    @staticmethod
+    def to_python(value):
+        # numpy scalars (e.g. of a graph loaded from a pickle) are stored as the python scalars they are equal to
+        return value.item() if hasattr(value, 'item') else value
+
+    @staticmethod
+    def get_key(graph):
+        # the key only depends on the vertex ids, the edges and their weights, not on the order they were added in
+        to_python = SolutionCache.to_python
+        vertices = sorted(to_python(vertex) for vertex in graph.nodes)
+        edges = sorted((to_python(min(u, v)), to_python(max(u, v)), to_python(graph[u][v]['weight']))
+                       for (u, v) in graph.edges)
+        return hashlib.sha256(json.dumps([vertices, edges]).encode()).hexdigest()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # several solver workers can use the cache at the same time, sqlite locks the file and waits for the lock
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS solutions "
+                           "(key TEXT PRIMARY KEY, cut TEXT, objective REAL, last_used REAL)")
+        return connection
+
+    def get(self, graph):
+        try:
+            key = self.get_key(graph)
+            connection = self._connect()
+            try:
+                row = connection.execute("SELECT cut, objective FROM solutions WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                connection.execute("UPDATE solutions SET last_used = ? WHERE key = ?", (time.time(), key))
+            finally:
+                connection.close()
+        except (sqlite3.Error, TypeError, ValueError):
+            # a broken or locked cache or a graph whose ids or weights can not be stored should never stop the solution
+            # from being calculated
+            return None
+
+        cut = []
+        for (u, v) in json.loads(row[0]):
+            cut.append((u, v))
+            cut.append((v, u))
+        return cut, row[1]
+
+    def put(self, graph, cut, objective):
+        try:
+            key = self.get_key(graph)
+            # both directions of every cut edge are returned by the solvers, but one is enough to store
+            cut = json.dumps(sorted(set((self.to_python(min(u, v)), self.to_python(max(u, v))) for (u, v) in cut)))
+            connection = self._connect()
+            try:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?)",
+                                   (key, cut, float(objective), time.time()))
+                # evict the least recently used solutions if the cache is too big
+                connection.execute("DELETE FROM solutions WHERE key NOT IN "
+                                   "(SELECT key FROM solutions ORDER BY last_used DESC LIMIT ?)", (self.max_entries,))
+                connection.execute("COMMIT")
+            finally:
+                connection.close()
+        except (sqlite3.Error, TypeError, ValueError):
+            pass
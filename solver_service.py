@@ -0,0 +1,272 @@
+import collections
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from multiprocessing.connection import wait
+
+import networkx as nx
+
+import constants
+from definitions import CACHE_DIR
+from solution_cache import SolutionCache
+from solvers import multicut_ilp_cycle, greedy_additive_edge_contraction, kernighan_lin, partition_from_cut, \
+    partition_objective, relative_gap, solve_decomposed
+
+
+def solve_job(vertices, edges, cache=None, heuristic_callback=None, initial_partition=None, progress_callback=None,
+              time_limit=None):
+    start_time = time.time()
+    graph = nx.Graph()
+    graph.add_nodes_from(vertices)
+    graph.add_weighted_edges_from(edges)
+
+    # graphs generated from a seed are the same on every launch, so their solution is usually known already
+    if cache is not None:
+        cached_solution = cache.get(graph)
+        if cached_solution is not None:
+            return (*cached_solution, True)
+
+    # the heuristic solution is available almost immediately and gives a target score until the ILP is solved, it
+    # starts from the given partition (e.g. the groups of the player) if that is better than the GAEC result
+    heuristic_cut, _ = greedy_additive_edge_contraction(graph)
+    partition = partition_from_cut(graph, heuristic_cut)
+    if (initial_partition is not None
+            and partition_objective(graph, initial_partition) < partition_objective(graph, partition)):
+        partition = initial_partition
+    heuristic_cut, heuristic_objective = kernighan_lin(graph, partition)
+    if heuristic_callback is not None:
+        heuristic_callback(heuristic_cut, heuristic_objective)
+
+    # the best known objective and the lower bound are reported after every round of the ILP, so there is a target
+    # score even if the time limit is reached before the solution is proven to be optimal
+    def report_progress(objective, bound):
+        if progress_callback is not None:
+            progress_callback(objective, bound, relative_gap(objective, bound), time.time() - start_time)
+
+    if time_limit is not None:
+        time_limit = max(time_limit - (time.time() - start_time), 0)
+
+    # decided edges are removed before the ILP and the independent parts of the graph are solved in parallel, the
+    # heuristic solution is the MIP start of every part
+    solution = solve_decomposed(graph, multicut_ilp_cycle, initial_partition=partition_from_cut(graph, heuristic_cut),
+                                time_limit=time_limit, progress_callback=report_progress)
+    # a solution that is not proven to be optimal would be returned as optimal when the graph is generated again
+    cut, objective, optimal = solution
+    if cache is not None and optimal:
+        cache.put(graph, cut, objective)
+    return solution
+
+
+def _worker(connection, cache):
+    if hasattr(os, 'setpgrp'):
+        # the worker leads its own process group, so killing the group also stops the CBC process of a cancelled job
+        os.setpgrp()
+
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        vertices, edges, initial_partition, time_limit = job
+        try:
+            solution = solve_job(vertices, edges, cache,
+                                 lambda cut, objective: connection.send(('heuristic', (cut, objective))),
+                                 initial_partition,
+                                 lambda *progress: connection.send(('progress', progress)),
+                                 time_limit)
+            connection.send(('result', solution))
+        except Exception as exception:
+            connection.send(('error', exception))
+
+
+class SolverJob:
+    def __init__(self, vertices, edges, heuristic_callback, initial_partition, progress_callback, time_limit):
+        self.vertices = vertices
+        self.edges = edges
+        self.initial_partition = initial_partition
+        self.time_limit = time_limit
+        self.heuristic_callback = heuristic_callback
+        self.progress_callback = progress_callback
+        self.future = Future()
+
+
+class SolverWorker:
+    def __init__(self, context, cache):
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=_worker, args=(worker_connection, cache), daemon=True)
+        self.process.start()
+        worker_connection.close()
+        self.job = None
+
+    def kill(self):
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.connection.close()
+
+
+class SolverService:
+    def __init__(self, max_workers, cache=None):
+        self.max_workers = max_workers
+        self.cache = cache
+        self._pending = collections.deque()
+        self._workers = []
+        self._lock = threading.RLock()
+        self._thread = None
+        self._wakeup_connection = None
+        self._wakeup_listener = None
+        self._is_shutdown = False
+
+    def submit(self, vertices, edges, heuristic_callback=None, initial_partition=None, progress_callback=None,
+               time_limit=None):
+        # solve jobs are plain vertex and edge lists, so they can be sent to the worker processes
+        job = SolverJob(list(vertices), [tuple(edge) for edge in edges], heuristic_callback, initial_partition,
+                        progress_callback, time_limit)
+        with self._lock:
+            if self._is_shutdown:
+                job.future.cancel()
+                return job.future
+            self._pending.append(job)
+            if self._thread is None:
+                # the worker processes are only started with the first job, so importing this module stays cheap
+                self._wakeup_listener, self._wakeup_connection = multiprocessing.Pipe(duplex=False)
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._wakeup()
+        return job.future
+
+    def cancel(self, future):
+        # the future of a job stays pending while the job runs, so cancelling it always makes future.cancelled() true
+        # unless the job is finished already, a pending job is skipped and the worker of a running job is killed
+        if future.cancel():
+            with self._lock:
+                if self._thread is not None and not self._is_shutdown:
+                    self._wakeup()
+
+    def shutdown(self):
+        with self._lock:
+            self._is_shutdown = True
+            thread = self._thread
+            if thread is not None:
+                self._wakeup()
+        if thread is not None:
+            thread.join()
+
+    def _wakeup(self):
+        self._wakeup_connection.send(None)
+
+    def _run(self):
+        context = multiprocessing.get_context('spawn')
+        while True:
+            with self._lock:
+                if self._is_shutdown:
+                    break
+                self._kill_cancelled_jobs()
+                self._start_pending_jobs(context)
+                connections = dict((worker.connection, worker) for worker in self._workers if worker.job is not None)
+
+            for connection in wait(list(connections.keys()) + [self._wakeup_listener]):
+                if connection is self._wakeup_listener:
+                    connection.recv()
+                else:
+                    # the callbacks of the game run without the lock, so they do not block submit and cancel
+                    with self._lock:
+                        job, message, payload = self._receive(connections[connection])
+                    self._deliver(job, message, payload)
+
+        with self._lock:
+            jobs = list(self._pending)
+            self._pending.clear()
+            for worker in self._workers:
+                if worker.job is not None:
+                    worker.kill()
+                    jobs.append(worker.job)
+                else:
+                    worker.stop()
+            self._workers = []
+        for job in jobs:
+            job.future.cancel()
+
+    def _kill_cancelled_jobs(self):
+        for worker in list(self._workers):
+            if worker.job is not None and worker.job.future.cancelled():
+                # a running CBC process can not be interrupted, so the whole worker is replaced
+                worker.kill()
+                self._workers.remove(worker)
+
+    def _start_pending_jobs(self, context):
+        while len(self._pending) > 0:
+            worker = next((worker for worker in self._workers if worker.job is None), None)
+            if worker is None:
+                if len(self._workers) >= self.max_workers:
+                    break
+                worker = SolverWorker(context, self.cache)
+                self._workers.append(worker)
+
+            # the future is not set to running, so it can still be cancelled while the job runs
+            job = self._pending.popleft()
+            if job.future.cancelled():
+                continue
+            worker.job = job
+            worker.connection.send((job.vertices, job.edges, job.initial_partition, job.time_limit))
+
+    def _receive(self, worker):
+        job = worker.job
+        try:
+            message, payload = worker.connection.recv()
+        except (EOFError, OSError):
+            # the worker process died, the job fails and a new worker is started for the next job
+            worker.kill()
+            self._workers.remove(worker)
+            return job, 'error', RuntimeError("solver process died")
+
+        if message in ('result', 'error'):
+            worker.job = None
+        return job, message, payload
+
+    def _deliver(self, job, message, payload):
+        if job.future.cancelled():
+            return
+        if message == 'heuristic':
+            if job.heuristic_callback is not None:
+                job.heuristic_callback(*payload)
+        elif message == 'progress':
+            if job.progress_callback is not None:
+                job.progress_callback(*payload)
+        elif message == 'result':
+            self._set_future(job.future, job.future.set_result, payload)
+        elif message == 'error':
+            self._set_future(job.future, job.future.set_exception, payload)
+
+    @staticmethod
+    def _set_future(future, set_outcome, outcome):
+        # the future can be cancelled by the game at any time until its outcome is set
+        try:
+            set_outcome(outcome)
+        except InvalidStateError:
+            pass
+
+
+solver_service = SolverService(constants.SOLVER_MAX_WORKERS, SolutionCache(
+    os.path.join(CACHE_DIR, 'solutions.sqlite'), constants.SOLUTION_CACHE_MAX_ENTRIES))
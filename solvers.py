@@ -1,71 +1,578 @@
+import collections
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+import numpy
 import pulp
 
+from sparse_model import SparseModel
+from union_find import UnionFind
+
 
-def multicut_ilp(graph):
-    # Define the ILP model which is a minimum multicut problem
-    model = pulp.LpProblem("Multicut", pulp.LpMinimize)
+def multicut_ilp(graph, statistics=None):
+    # Define the ILP model which is a minimum multicut problem, the constraints are generated as arrays of vertex and
+    # edge indices so there is no Python loop over every vertex pair and edge
+    vertices = list(graph.nodes)
+    vertex_index = dict((vertex, i) for i, vertex in enumerate(vertices))
+    n = len(vertices)
+    m = graph.number_of_edges()
 
-    # Generate symmetric edges
+    # Generate symmetric edges, the directed edge i and i + m are the two directions of the same edge
     edges = list(graph.edges)
-    edges += [(v, u) for (u, v) in graph.edges]
+    sources = numpy.array([vertex_index[u] for (u, v) in edges] + [vertex_index[v] for (u, v) in edges], dtype=int)
+    targets = numpy.concatenate((sources[m:], sources[:m]))
+    weights = numpy.array([graph[u][v]['weight'] for (u, v) in edges], dtype=float)
 
     # Create a binary variable for each edge where
     # x(u, v) = 0 means the edge between u and v is not cut
     # x(u, v) = 1 means the edge between u and v is cut
-    x = pulp.LpVariable.dicts("x", edges, lowBound=0, upBound=1, cat=pulp.LpInteger)
-
-    # Generate symmetric and non-symmetric vertex pairs
-    all_vertex_perm = [pair for pair in pulp.allpermutations(graph.nodes, 2) if len(pair) == 2]
-    all_vertex_comb = [pair for pair in pulp.allcombinations(graph.nodes, 2) if len(pair) == 2]
-
-    # Create a binary variable for each vertex pair where
+    # and a binary variable for each vertex pair where
     # path(u, v) = 0 means there is a path from u to v
     # path(u, v) = 1 means there is no path from u to v
-    path = pulp.LpVariable.dicts("path", all_vertex_perm, lowBound=0, upBound=1, cat=pulp.LpInteger)
+    # x(i) is the variable i and path(u, v) is the variable 2m + u * (n - 1) + v (- 1 if v > u)
+    def path(u, v):
+        return 2 * m + u * (n - 1) + v - (v > u)
 
-    # Create a PuLP model
-    model += pulp.lpSum([graph[u][v]['weight'] * x[(u, v)] for (u, v) in graph.edges])
+    model = SparseModel(numpy.concatenate((weights, numpy.zeros(m), numpy.zeros(n * (n - 1)))))
 
     # Add the constraints
-    for (u, v) in graph.edges:
-        # if the edge from u to v is cut then the edge from v to u is also cut
-        model += x[(u, v)] - x[(v, u)] == 0
-
-        # if cut then there is no path, if not cut then there is a path
-        model += path[(u, v)] + x[(u, v)] == 1
-
-    for (u, v) in all_vertex_comb:
-        # if there is a path from u to v, then there is a path from v to u
-        model += path[(u, v)] - path[(v, u)] == 0
-
-        for (w, l) in edges:
-            if w == u and l != v:
-                # if there is an uncut edge u to l and a path l to v, there must be a path u to v
-                # if there is an uncut edge u to l but no path l to v, there can't be a path u to v
-                # if there is a cut edge u to l but a path l to v, there can't be a path u to v
-                # NOTE: if there is a cut edge u to l and no path l to v, there can be a path from u to v but doesn't
-                # have to, both is possible
-                # DNF: (PATH(u, v) ∧ UNCUT(u, l) ∧ PATH(l, v)) ∨ (¬PATH(u, v) ∧ ¬UNCUT(u, l))
-                # ∨ (¬PATH(u, v) ∧ ¬PATH(l, v)) ∨ (¬UNCUT(u, l) ∧ ¬PATH(l, v))
-                # CNF: (¬PATH(u, v) ∨ ¬UNCUT(u, l) ∨ PATH(l, v)) ∧ (¬PATH(u, v) ∨ UNCUT(u, l) ∨ ¬PATH(l, v))
-                # ∧ (PATH(u, v) ∨ ¬UNCUT(u, l) ∨ ¬PATH(l, v))
-                model += 1 - path[(u, v)] + x[(u, l)] + path[(l, v)] >= 1
-                model += 1 - path[(u, v)] + 1 - x[(u, l)] + 1 - path[(l, v)] >= 1
-                model += path[(u, v)] + x[(u, l)] + 1 - path[(l, v)] >= 1
+    # if the edge from u to v is cut then the edge from v to u is also cut
+    undirected = numpy.arange(m)
+    model.add_constraints(numpy.repeat(undirected, 2), numpy.column_stack((undirected, undirected + m)).ravel(),
+                          numpy.tile([1, -1], m), '=', numpy.zeros(m))
+    # if cut then there is no path, if not cut then there is a path
+    model.add_constraints(numpy.repeat(undirected, 2),
+                          numpy.column_stack((path(sources[:m], targets[:m]), undirected)).ravel(), 1, '=',
+                          numpy.ones(m))
 
-    # Solve the problem
-    model.solve()
+    # Generate non-symmetric vertex pairs
+    pair_u, pair_v = numpy.triu_indices(n, 1)
+    pairs = numpy.arange(len(pair_u))
 
-    # Print the results for debugging
-    # print("Status: ", pulp.LpStatus[model.status])
-    # print("Optimal value: ", pulp.value(model.objective))
-    # for e in graph.edges:
-    #     print("Edge ({},{}): {}".format(e[0], e[1], pulp.value(x[e])))
+    # if there is a path from u to v, then there is a path from v to u
+    model.add_constraints(numpy.repeat(pairs, 2),
+                          numpy.column_stack((path(pair_u, pair_v), path(pair_v, pair_u))).ravel(),
+                          numpy.tile([1, -1], len(pairs)), '=', numpy.zeros(len(pairs)))
+
+    # every directed edge (u, l) starting at u of every pair (u, v) with l != v, the directed edges are sorted by
+    # their source so the edges of u are a consecutive range
+    order = numpy.argsort(sources, kind='stable')
+    degrees = numpy.bincount(sources, minlength=n)
+    offsets = numpy.concatenate(([0], numpy.cumsum(degrees)))
+    counts = degrees[pair_u]
+    triple_pairs = numpy.repeat(pairs, counts)
+    triple_edges = order[numpy.repeat(offsets[pair_u], counts) + numpy.arange(counts.sum())
+                         - numpy.repeat(numpy.cumsum(counts) - counts, counts)]
+    keep = targets[triple_edges] != pair_v[triple_pairs]
+    triple_pairs, triple_edges = triple_pairs[keep], triple_edges[keep]
+    u, v, l = pair_u[triple_pairs], pair_v[triple_pairs], targets[triple_edges]
+
+    # if there is an uncut edge u to l and a path l to v, there must be a path u to v
+    # if there is an uncut edge u to l but no path l to v, there can't be a path u to v
+    # if there is a cut edge u to l but a path l to v, there can't be a path u to v
+    # NOTE: if there is a cut edge u to l and no path l to v, there can be a path from u to v but doesn't
+    # have to, both is possible
+    # DNF: (PATH(u, v) ∧ UNCUT(u, l) ∧ PATH(l, v)) ∨ (¬PATH(u, v) ∧ ¬UNCUT(u, l))
+    # ∨ (¬PATH(u, v) ∧ ¬PATH(l, v)) ∨ (¬UNCUT(u, l) ∧ ¬PATH(l, v))
+    # CNF: (¬PATH(u, v) ∨ ¬UNCUT(u, l) ∨ PATH(l, v)) ∧ (¬PATH(u, v) ∨ UNCUT(u, l) ∨ ¬PATH(l, v))
+    # ∧ (PATH(u, v) ∨ ¬UNCUT(u, l) ∨ ¬PATH(l, v))
+    triples = numpy.arange(len(triple_edges))
+    columns = numpy.column_stack((path(u, v), triple_edges, path(l, v))).ravel()
+    for coefficients, rhs in (([-1, 1, 1], 0), ([-1, -1, -1], -2), ([1, 1, -1], 0)):
+        model.add_constraints(numpy.repeat(triples, 3), columns, numpy.tile(coefficients, len(triples)), '>=',
+                              numpy.full(len(triples), rhs))
+
+    # Solve the problem
+    _, values = model.solve(integer=True)
+    if statistics is not None:
+        statistics.update(model.get_statistics())
 
     # Extract the optimal solution and return
     opt_cut = []
-    for (u, v) in graph.edges():
-        if x[(u, v)].varValue == 1:
+    for i, (u, v) in enumerate(edges):
+        if round(values[i]) == 1:
             opt_cut.append((u, v))
             opt_cut.append((v, u))
-    return opt_cut, pulp.value(model.objective)
+    return opt_cut, float(weights @ numpy.round(values[:m]))
+
+
+def multicut_ilp_cycle(graph, initial_partition=None, time_limit=None, progress_callback=None, statistics=None,
+                       tolerance=1e-6):
+    start_time = time.time()
+
+    # Define the ILP model which is a minimum multicut problem, in contrast to multicut_ilp there is only one variable
+    # per undirected edge and the constraints that make the cut a valid multicut (cycle inequalities) are only added
+    # when the current solution violates them
+    # Create a variable for each edge where
+    # x(i) = 0 means edge i is not cut
+    # x(i) = 1 means edge i is cut
+    # the variables are continuous in the first rounds so they only solve the cheap LP relaxation
+    edges = list(graph.edges)
+    edge_index = dict((edge, i) for i, edge in enumerate(edges))
+    weights = numpy.array([graph[u][v]['weight'] for (u, v) in edges], dtype=float)
+    model = SparseModel(weights)
+
+    # the best known partition (vertex -> label), it is passed to CBC as MIP start so branch and bound begins with a
+    # good solution instead of searching for one first, without one every vertex is in the same group, which is not
+    # passed to CBC because such a bad start makes branch and bound slower
+    incumbent = initial_partition
+    warm_start = incumbent is not None
+    if incumbent is None:
+        incumbent = partition_from_cut(graph, [])
+    incumbent_objective = partition_objective(graph, incumbent)
+
+    # cutting every edge with negative weight is a lower bound for every multicut until the first model is solved
+    bound = numpy.minimum(weights, 0).sum()
+
+    # first separate on the fractional LP solution, then make the variables binary and separate on the integer solution
+    # until it does not violate any cycle inequality anymore, which means it is an optimal multicut, if the time limit
+    # is reached before the best known partition is returned
+    rounds = 0
+    for integer in (False, True):
+        while True:
+            time_left = None
+            if time_limit is not None:
+                time_left = time_limit - (time.time() - start_time)
+                if time_left <= 0:
+                    break
+
+            initial_values = None
+            if integer and warm_start:
+                initial_values = [int(incumbent[u] != incumbent[v]) for (u, v) in edges]
+            status, x = model.solve(integer, initial_values, time_left)
+            rounds += 1
+            values = dict(zip(edges, x))
+            if status == pulp.LpSolutionOptimal:
+                # the model only contains some of the cycle inequalities, so its optimum is a lower bound
+                bound = max(bound, weights @ x)
+
+            # the groups of the edges that are (mostly) not cut are a valid partition even if the cut is not valid yet
+            partition = partition_from_cut(graph, [edge for edge in edges if round(values[edge]) == 1])
+            objective = partition_objective(graph, partition)
+            if objective < incumbent_objective:
+                incumbent, incumbent_objective = partition, objective
+                warm_start = True
+            if progress_callback is not None:
+                progress_callback(incumbent_objective, min(bound, incumbent_objective))
+
+            if time_limit is not None:
+                time_left = time_limit - (time.time() - start_time)
+            cycles = separate_cycle_inequalities(graph, values, tolerance, time_left)
+            if len(cycles) == 0:
+                break
+
+            # if the edge of a cycle is cut then at least one other edge on the cycle has to be cut as well, so every
+            # cycle is a row with 1 for the edge and -1 for the other edges of the cycle
+            columns = [[edge_index[edge]] + [edge_index[path_edge] for path_edge in path] for edge, path in cycles]
+            lengths = numpy.array([len(cycle) for cycle in columns])
+            coefficients = numpy.full(lengths.sum(), -1.0)
+            coefficients[numpy.cumsum(lengths) - lengths] = 1
+            model.add_constraints(numpy.repeat(numpy.arange(len(cycles)), lengths),
+                                  numpy.fromiter(itertools.chain.from_iterable(columns), dtype=int), coefficients, '<=',
+                                  numpy.zeros(len(cycles)))
+
+    if statistics is not None:
+        statistics.update(model.get_statistics(), rounds=rounds)
+
+    # Extract the best solution and return, it is only proven to be optimal if it reaches the lower bound, which is not
+    # the case if the time limit stopped the solve early
+    opt_cut = []
+    for (u, v) in edges:
+        if incumbent[u] != incumbent[v]:
+            opt_cut.append((u, v))
+            opt_cut.append((v, u))
+    return opt_cut, incumbent_objective, incumbent_objective - bound <= tolerance
+
+
+def greedy_additive_edge_contraction(graph):
+    # Greedy additive edge contraction (GAEC): start with every vertex in its own group and always join the two groups
+    # with the highest positive summed weight between them, this is not optimal but takes only milliseconds
+    union_find = UnionFind(graph.nodes)
+    adjacency = weighted_adjacency(graph)
+
+    # max heap of possible joins, entries get outdated when one of the groups is joined and are skipped then
+    heap = [(-weight, u, v) for u in adjacency for v, weight in adjacency[u].items() if u < v and weight > 0]
+    heapq.heapify(heap)
+
+    while len(heap) > 0:
+        negative_weight, u, v = heapq.heappop(heap)
+        if u not in adjacency or v not in adjacency[u] or adjacency[u][v] != -negative_weight:
+            continue
+
+        root = join_groups(adjacency, union_find, u, v)
+        for neighbour, weight in adjacency[root].items():
+            if weight > 0:
+                heapq.heappush(heap, (-weight, root, neighbour))
+
+    # every edge between two different groups is cut
+    cut = []
+    objective = 0
+    for (u, v) in graph.edges:
+        if not union_find.connected(u, v):
+            cut.append((u, v))
+            cut.append((v, u))
+            objective += graph[u][v]['weight']
+    return cut, objective
+
+
+def weighted_adjacency(graph):
+    # summed weight between neighbouring groups, at first every vertex is its own group
+    adjacency = dict((u, {}) for u in graph.nodes)
+    for (u, v) in graph.edges:
+        adjacency[u][v] = graph[u][v]['weight']
+        adjacency[v][u] = graph[u][v]['weight']
+    return adjacency
+
+
+def join_groups(adjacency, union_find, u, v):
+    # join the groups of the union find roots u and v, the groups are identified by their root afterwards
+    root = union_find.union(u, v)
+    other = v if root == u else u
+
+    # the joined group inherits the neighbours of both groups and their weights are summed up
+    root_adjacency = adjacency[root]
+    root_adjacency.pop(other, None)
+    for neighbour, weight in adjacency.pop(other).items():
+        if neighbour == root:
+            continue
+        adjacency[neighbour].pop(other)
+        root_adjacency[neighbour] = root_adjacency.get(neighbour, 0) + weight
+        adjacency[neighbour][root] = root_adjacency[neighbour]
+    return root
+
+
+def presolve(graph):
+    # decide the edges that are cut or not cut in at least one optimal solution and split the rest of the graph into
+    # independent subproblems, returns the subproblems and the mapping of every vertex to its subproblem vertex
+    union_find = UnionFind(graph.nodes)
+    adjacency = weighted_adjacency(graph)
+
+    changed = True
+    while changed:
+        changed = False
+
+        # if the weight of a positive edge is at least as big as the absolute weight of all other edges of one of its
+        # groups, moving that group to the other side never makes the objective worse, so the edge can be contracted
+        for u in list(adjacency.keys()):
+            if u not in adjacency:
+                continue
+            mass = sum(abs(weight) for weight in adjacency[u].values())
+            for v, weight in list(adjacency[u].items()):
+                if weight > 0 and 2 * weight >= mass:
+                    join_groups(adjacency, union_find, u, v)
+                    changed = True
+                    break
+
+        # a bridge is the only connection between its two sides, so a positive bridge is never cut and a negative
+        # bridge is always cut without affecting any other edge
+        reduced_graph = nx.Graph()
+        reduced_graph.add_nodes_from(adjacency.keys())
+        reduced_graph.add_edges_from((u, v) for u in adjacency for v in adjacency[u] if u < v)
+        for (u, v) in list(nx.bridges(reduced_graph)):
+            # contracting a bridge does not change any other bridge, only the group it belongs to
+            u, v = union_find.find(u), union_find.find(v)
+            if adjacency[u][v] > 0:
+                join_groups(adjacency, union_find, u, v)
+            else:
+                adjacency[u].pop(v)
+                adjacency[v].pop(u)
+            changed = True
+
+    subproblems = []
+    for component in nx.connected_components(nx.Graph([(u, v) for u in adjacency for v in adjacency[u] if u < v])):
+        subproblem = nx.Graph()
+        subproblem.add_nodes_from(component)
+        subproblem.add_weighted_edges_from((u, v, adjacency[u][v]) for u in component for v in adjacency[u] if u < v)
+        subproblems.append(subproblem)
+    return subproblems, dict((vertex, union_find.find(vertex)) for vertex in graph.nodes)
+
+
+def solve_decomposed(graph, solver=None, max_workers=None, initial_partition=None, time_limit=None,
+                     progress_callback=None, statistics=None):
+    # solve the independent subproblems left over by the presolve in parallel and stitch their solutions together, the
+    # solver returns the cut, the objective and whether the objective is proven to be optimal like multicut_ilp_cycle,
+    # the whole solution is optimal if the solutions of all subproblems are
+    start_time = time.time()
+    if solver is None:
+        solver = multicut_ilp_cycle
+    subproblems, representatives = presolve(graph)
+
+    # the edges between different subproblems are always cut, so the objective and the bound of the whole graph are
+    # their weight plus the sum of the objectives and bounds of the subproblems
+    components = dict((representative, representative) for representative in representatives.values())
+    for subproblem in subproblems:
+        component = next(iter(subproblem.nodes))
+        components.update((vertex, component) for vertex in subproblem)
+    offset = sum(graph[u][v]['weight'] for (u, v) in graph.edges
+                 if components[representatives[u]] != components[representatives[v]])
+
+    subproblem_partitions = [None] * len(subproblems)
+    if initial_partition is not None:
+        # a subproblem vertex stands for all vertices contracted into it and takes the label of its representative
+        subproblem_partitions = [dict((vertex, initial_partition[vertex]) for vertex in subproblem)
+                                 for subproblem in subproblems]
+    objectives = [0 if partition is None else partition_objective(subproblem, partition)
+                  for subproblem, partition in zip(subproblems, subproblem_partitions)]
+    bounds = [sum(min(weight, 0) for _, _, weight in subproblem.edges(data='weight')) for subproblem in subproblems]
+    subproblem_statistics = [{} for _ in subproblems]
+    progress_lock = threading.Lock()
+
+    def report_progress(index, objective, bound):
+        with progress_lock:
+            objectives[index], bounds[index] = objective, bound
+            progress_callback(offset + sum(objectives), offset + sum(bounds))
+
+    def solve_subproblem(index):
+        arguments = {}
+        if subproblem_partitions[index] is not None:
+            arguments['initial_partition'] = subproblem_partitions[index]
+        if time_limit is not None:
+            # subproblems that wait for a free thread get less time, so the whole solve stays within the limit
+            arguments['time_limit'] = max(time_limit - (time.time() - start_time), 0)
+        if progress_callback is not None:
+            arguments['progress_callback'] = lambda objective, bound: report_progress(index, objective, bound)
+        if statistics is not None:
+            arguments['statistics'] = subproblem_statistics[index]
+        return solver(subproblems[index], **arguments)
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        solutions = list(executor.map(solve_subproblem, range(len(subproblems))))
+
+    if statistics is not None:
+        # the models of the subproblems are independent, so the size of the whole model is the sum of their sizes
+        statistics['subproblems'] = len(subproblems)
+        for values in subproblem_statistics:
+            for key, value in values.items():
+                statistics[key] = statistics.get(key, 0) + value
+
+    # two vertices are in the same group if their subproblem vertices are in the same group of the same subproblem,
+    # every subproblem vertex that is not part of a subproblem is a group of its own
+    labels = dict((representative, representative) for representative in representatives.values())
+    for subproblem, (cut, _, _) in zip(subproblems, solutions):
+        labels.update(partition_from_cut(subproblem, cut))
+
+    cut = []
+    objective = 0
+    for (u, v) in graph.edges:
+        if labels[representatives[u]] != labels[representatives[v]]:
+            cut.append((u, v))
+            cut.append((v, u))
+            objective += graph[u][v]['weight']
+    return cut, objective, all(optimal for _, _, optimal in solutions)
+
+
+def kernighan_lin(graph, partition, time_limit=None, history=None, tolerance=1e-6):
+    # Kernighan-Lin style local search: improve a given partition (vertex -> label) by moving vertices between pairs of
+    # neighbouring groups, by moving vertices into a new group and by joining groups, it stops when no step improves the
+    # objective anymore or the time limit is reached, so it can be used as an anytime improvement of any solution
+    start_time = time.time()
+    labels = dict(partition)
+    members = {}
+    for vertex, label in labels.items():
+        members.setdefault(label, set()).add(vertex)
+    new_labels = itertools.count(max(members.keys(), default=-1) + 1)
+
+    # gain table, weight_to[v][label] is the summed weight of the edges from v to the vertices with the label
+    weight_to = dict((vertex, {}) for vertex in graph.nodes)
+    for (u, v) in graph.edges:
+        weight = graph[u][v]['weight']
+        weight_to[u][labels[v]] = weight_to[u].get(labels[v], 0) + weight
+        weight_to[v][labels[u]] = weight_to[v].get(labels[u], 0) + weight
+
+    def move(vertex, label):
+        members[labels[vertex]].discard(vertex)
+        for neighbour in graph[vertex]:
+            weight = graph[vertex][neighbour]['weight']
+            weight_to[neighbour][labels[vertex]] -= weight
+            weight_to[neighbour][label] = weight_to[neighbour].get(label, 0) + weight
+        labels[vertex] = label
+        members.setdefault(label, set()).add(vertex)
+
+    def gain(vertex, label):
+        # how much the objective decreases if the vertex is moved to the group with the label
+        return weight_to[vertex].get(label, 0) - weight_to[vertex].get(labels[vertex], 0)
+
+    def two_group_pass(label1, label2):
+        # move every vertex of both groups at most once to the other group, always taking the best move even if it
+        # makes the objective worse, then keep only the best prefix of the move sequence
+        moved = []
+        locked = set()
+        total_gain = 0
+        best_gain = 0
+        best_length = 0
+        counter = itertools.count()
+        heap = []
+        for vertex in members[label1] | members[label2]:
+            other = label2 if labels[vertex] == label1 else label1
+            heapq.heappush(heap, (-gain(vertex, other), next(counter), vertex))
+
+        while len(heap) > 0:
+            negative_gain, _, vertex = heapq.heappop(heap)
+            other = label2 if labels[vertex] == label1 else label1
+            if vertex in locked or -negative_gain != gain(vertex, other):
+                continue
+
+            moved.append((vertex, labels[vertex]))
+            locked.add(vertex)
+            total_gain -= negative_gain
+            move(vertex, other)
+            if total_gain > best_gain + tolerance:
+                best_gain = total_gain
+                best_length = len(moved)
+
+            # only the gains of the neighbours have changed
+            for neighbour in graph[vertex]:
+                if neighbour not in locked and labels[neighbour] in (label1, label2):
+                    neighbour_other = label2 if labels[neighbour] == label1 else label1
+                    heapq.heappush(heap, (-gain(neighbour, neighbour_other), next(counter), neighbour))
+
+        for vertex, label in reversed(moved[best_length:]):
+            move(vertex, label)
+        return best_gain
+
+    objective = sum(graph[u][v]['weight'] for (u, v) in graph.edges if labels[u] != labels[v])
+    if history is not None:
+        history.append((time.time() - start_time, objective))
+
+    improved = True
+    while improved and (time_limit is None or time.time() - start_time < time_limit):
+        improved = False
+        pairs = set()
+        for (u, v) in graph.edges:
+            if labels[u] != labels[v]:
+                pairs.add((min(labels[u], labels[v]), max(labels[u], labels[v])))
+        # a group can also be split by moving some of its vertices into a new group
+        pairs.update((label, None) for label, vertices in members.items() if len(vertices) > 1)
+
+        for label1, label2 in pairs:
+            if time_limit is not None and time.time() - start_time >= time_limit:
+                break
+            if len(members.get(label1, ())) == 0 or (label2 is not None and len(members.get(label2, ())) == 0):
+                continue
+
+            if label2 is None:
+                label2 = next(new_labels)
+                members[label2] = set()
+                join_gain = 0
+            else:
+                join_gain = sum(weight_to[vertex].get(label2, 0) for vertex in members[label1])
+
+            pass_gain = two_group_pass(label1, label2)
+            if join_gain > max(pass_gain, 0) + tolerance:
+                # joining both groups is better than moving single vertices
+                for vertex in list(members[label1] | members[label2]):
+                    if labels[vertex] != label2:
+                        move(vertex, label2)
+                pass_gain = join_gain
+
+            for label in (label1, label2):
+                if len(members[label]) == 0:
+                    members.pop(label)
+
+            if pass_gain > tolerance:
+                improved = True
+                objective -= pass_gain
+                if history is not None:
+                    history.append((time.time() - start_time, objective))
+
+    # every edge between two different groups is cut
+    cut = []
+    objective = 0
+    for (u, v) in graph.edges:
+        if labels[u] != labels[v]:
+            cut.append((u, v))
+            cut.append((v, u))
+            objective += graph[u][v]['weight']
+    return cut, objective
+
+
+def partition_from_cut(graph, cut):
+    # label every vertex with the group it is in when the edges of the cut are removed
+    cut = set(cut)
+    union_find = UnionFind(graph.nodes)
+    for (u, v) in graph.edges:
+        if (u, v) not in cut and (v, u) not in cut:
+            union_find.union(u, v)
+    return dict((vertex, union_find.find(vertex)) for vertex in graph.nodes)
+
+
+def partition_objective(graph, partition):
+    return sum(graph[u][v]['weight'] for (u, v) in graph.edges if partition[u] != partition[v])
+
+
+def relative_gap(objective, bound, tolerance=1e-6):
+    # the distance between the best known objective and the lower bound relative to the larger of both, like the gap
+    # MIP solvers report, 0 means the objective is optimal
+    if objective - bound <= tolerance:
+        return 0
+    return (objective - bound) / max(abs(objective), abs(bound))
+
+
+def separate_cycle_inequalities(graph, values, tolerance=1e-6, time_limit=None, max_cycles=1000):
+    # a cycle inequality x(u, v) <= sum of x(e) over the other edges e of a cycle is violated if there is a path from
+    # u to v that is shorter than x(u, v) when x is used as edge length, so only edges with x(u, v) > 0 can be violated
+    # and the shortest paths are only searched from one end of these edges
+    lengths = dict((u, {}) for u in graph.nodes)
+    for (u, v), value in values.items():
+        lengths[u][v] = lengths[v][u] = max(value, 0)
+
+    # every cut edge is searched from the end with more cut edges, so a few searches cover all of them, the searches
+    # from the ends of the edges with the largest x come first as their inequalities can be violated the most
+    cut_edges = [(u, v) for (u, v), value in values.items() if value > tolerance]
+    degrees = collections.Counter(itertools.chain.from_iterable(cut_edges))
+    targets = {}
+    for (u, v) in cut_edges:
+        if degrees[v] > degrees[u]:
+            u, v = v, u
+        targets.setdefault(u, []).append(v)
+    sources = sorted(targets, key=lambda u: max(lengths[u][v] for v in targets[u]), reverse=True)
+
+    start_time = time.time()
+    cycles = []
+    for u in sources:
+        # the inequalities found so far are returned when enough were found or the time is up, which is enough to
+        # continue the solve
+        if len(cycles) >= max_cycles or (time_limit is not None and len(cycles) > 0
+                                         and time.time() - start_time > time_limit):
+            break
+        distances, predecessors = shortest_paths(lengths, u, targets[u], tolerance)
+        for v in distances:
+            path = [v]
+            while path[-1] != u:
+                path.append(predecessors[path[-1]])
+            cycles.append(((u, v) if (u, v) in values else (v, u),
+                           [(a, b) if (a, b) in values else (b, a) for a, b in zip(path, path[1:])]))
+    return cycles
+
+
+def shortest_paths(lengths, source, targets, tolerance):
+    # Dijkstra from the source to the targets that are closer than the length of their edge to the source, paths that
+    # are already too long for every target that is not reached yet are not followed and the search stops once every
+    # target is reached
+    remaining = dict((v, lengths[source][v] - tolerance) for v in targets)
+    cutoff = max(remaining.values())
+    distances = {source: 0}
+    predecessors = {}
+    found = {}
+    visited = set()
+    counter = itertools.count()
+    heap = [(0, next(counter), source)]
+    while len(heap) > 0 and len(remaining) > 0:
+        distance, _, u = heapq.heappop(heap)
+        if u in visited:
+            continue
+        visited.add(u)
+        if u in remaining:
+            if distance < remaining.pop(u):
+                found[u] = distance
+            cutoff = max(remaining.values(), default=0)
+        for v, length in lengths[u].items():
+            if distance + length < min(cutoff, distances.get(v, cutoff)):
+                distances[v] = distance + length
+                predecessors[v] = u
+                heapq.heappush(heap, (distance + length, next(counter), v))
+    return found, predecessors
@@ -0,0 +1,127 @@
+import os
+import subprocess
+import tempfile
+
+import numpy
+import pulp
+
+
+class SparseModel:
+    # a minimization problem min c x subject to lower <= x <= upper and rows of A x (<=, =, >=) b, the constraint
+    # matrix is kept as COO arrays and handed to CBC as one MPS file instead of building a PuLP expression per term
+    SENSES = {'<=': 'L', '=': 'E', '>=': 'G'}
+
+    def __init__(self, objective, lower=0, upper=1):
+        self.objective = numpy.asarray(objective, dtype=float)
+        self.lower = numpy.broadcast_to(numpy.asarray(lower, dtype=float), self.objective.shape)
+        self.upper = numpy.broadcast_to(numpy.asarray(upper, dtype=float), self.objective.shape)
+        self.rows = []
+        self.columns = []
+        self.coefficients = []
+        self.senses = []
+        self.rhs = []
+        self.row_count = 0
+
+    def add_constraints(self, rows, columns, coefficients, sense, rhs):
+        # rows are numbered from 0 for every call, all added constraints have the same sense
+        rhs = numpy.asarray(rhs, dtype=float)
+        self.rows.append(numpy.asarray(rows, dtype=numpy.int64) + self.row_count)
+        self.columns.append(numpy.asarray(columns, dtype=numpy.int64))
+        self.coefficients.append(numpy.broadcast_to(numpy.asarray(coefficients, dtype=float), self.rows[-1].shape))
+        self.senses.append(numpy.full(len(rhs), self.SENSES[sense]))
+        self.rhs.append(rhs)
+        self.row_count += len(rhs)
+
+    def get_statistics(self):
+        return {'variables': len(self.objective), 'constraints': self.row_count,
+                'nonzeros': sum(len(rows) for rows in self.rows)}
+
+    def solve(self, integer=False, initial_values=None, time_limit=None):
+        # returns the solution status as a PuLP solution status and the values of the variables
+        with tempfile.TemporaryDirectory() as directory:
+            model_path = os.path.join(directory, 'model.mps')
+            start_path = os.path.join(directory, 'start.mst')
+            solution_path = os.path.join(directory, 'solution.sol')
+
+            self.write_mps(model_path, integer)
+            arguments = [pulp.PULP_CBC_CMD().path, model_path]
+            if integer and initial_values is not None:
+                self.write_start(start_path, initial_values)
+                arguments += ['mips', start_path]
+            if time_limit is not None:
+                arguments += ['sec', str(time_limit)]
+            arguments += ['branch' if integer else 'initialSolve', 'solution', solution_path]
+
+            startupinfo = None
+            if os.name == 'nt':
+                # prevent a console window from flashing up while the game is running
+                startupinfo = subprocess.STARTUPINFO()
+                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+            subprocess.run(arguments, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           startupinfo=startupinfo, check=True)
+            return self.read_solution(solution_path)
+
+    def write_mps(self, path, integer):
+        rows = numpy.concatenate(self.rows + [numpy.zeros(0, dtype=numpy.int64)])
+        columns = numpy.concatenate(self.columns + [numpy.zeros(0, dtype=numpy.int64)])
+        coefficients = numpy.concatenate(self.coefficients + [numpy.zeros(0)])
+        senses = numpy.concatenate(self.senses + [numpy.zeros(0, dtype='<U1')])
+        rhs = numpy.concatenate(self.rhs + [numpy.zeros(0)])
+
+        # every entry of a column has to be written in one block, the objective is the row after the constraints
+        variable_count = len(self.objective)
+        rows = numpy.concatenate((rows, numpy.full(variable_count, self.row_count)))
+        columns = numpy.concatenate((columns, numpy.arange(variable_count)))
+        coefficients = numpy.concatenate((coefficients, self.objective))
+        order = numpy.argsort(columns, kind='stable')
+        entries = numpy.column_stack((columns[order], rows[order], coefficients[order]))
+
+        with open(path, 'w') as file:
+            # free format MPS, so names and numbers do not have to fit into fixed columns
+            file.write("NAME MODEL FREE\nROWS\n")
+            file.write(f" N R{self.row_count}\n")
+            numpy.savetxt(file, numpy.column_stack((senses, numpy.arange(self.row_count))), fmt=" %s R%s")
+            file.write("COLUMNS\n")
+            if integer:
+                file.write(" MARKER 'MARKER' 'INTORG'\n")
+            numpy.savetxt(file, entries, fmt=" X%d R%d %.17g")
+            if integer:
+                file.write(" MARKER 'MARKER' 'INTEND'\n")
+            file.write("RHS\n")
+            numpy.savetxt(file, numpy.column_stack((numpy.arange(self.row_count), rhs)), fmt=" RHS R%d %.17g")
+            file.write("BOUNDS\n")
+            numpy.savetxt(file, numpy.column_stack((numpy.arange(variable_count), self.lower)), fmt=" LO BND X%d %.17g")
+            numpy.savetxt(file, numpy.column_stack((numpy.arange(variable_count), self.upper)), fmt=" UP BND X%d %.17g")
+            file.write("ENDATA\n")
+
+    def write_start(self, path, values):
+        # the same format as a CBC solution file, the status line is ignored by CBC
+        with open(path, 'w') as file:
+            file.write("Stopped on time - objective value 0\n")
+            numpy.savetxt(file, numpy.column_stack((numpy.arange(len(values)), numpy.arange(len(values)),
+                                                    numpy.asarray(values, dtype=float))), fmt="%d X%d %.17g 0")
+
+    def read_solution(self, path):
+        values = numpy.zeros(len(self.objective))
+        with open(path) as file:
+            status = file.readline().split()
+            for line in file:
+                fields = line.split()
+                # values of infeasible rows and columns are marked with **
+                if len(fields) > 0 and fields[0] == '**':
+                    fields = fields[1:]
+                if len(fields) >= 3 and fields[1][0] == 'X':
+                    values[int(fields[1][1:])] = float(fields[2])
+
+        if len(status) == 0:
+            return pulp.LpSolutionNoSolutionFound, values
+        if status[0] == 'Optimal':
+            return pulp.LpSolutionOptimal, values
+        if status[0] == 'Infeasible' or status[0] == 'Integer':
+            return pulp.LpSolutionInfeasible, values
+        if status[0] == 'Unbounded':
+            return pulp.LpSolutionUnbounded, values
+        # a stopped solve still has a solution if CBC reports its objective value
+        if status[0] == 'Stopped' and len(status) >= 5 and status[4] == 'objective':
+            return pulp.LpSolutionIntegerFeasible, values
+        return pulp.LpSolutionNoSolutionFound, values
@@ -0,0 +1,43 @@
+class UnionFind:
+    def __init__(self, elements=()):
+        self.parent = {}
+        self.size = {}
+        for element in elements:
+            self.add(element)
+
+    def add(self, element):
+        if element not in self.parent:
+            self.parent[element] = element
+            self.size[element] = 1
+
+    def find(self, element):
+        root = element
+        while self.parent[root] != root:
+            root = self.parent[root]
+
+        # path compression, every element on the way points directly to the root afterwards
+        while self.parent[element] != root:
+            self.parent[element], element = root, self.parent[element]
+        return root
+
+    def union(self, element1, element2):
+        root1 = self.find(element1)
+        root2 = self.find(element2)
+        if root1 == root2:
+            return root1
+
+        # union by size, the smaller tree is attached to the bigger one
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size.pop(root2)
+        return root1
+
+    def connected(self, element1, element2):
+        return self.find(element1) == self.find(element2)
+
+    def groups(self):
+        groups = {}
+        for element in self.parent:
+            groups.setdefault(self.find(element), []).append(element)
+        return list(groups.values())
@@ -1,11 +1,10 @@
+import collections
 import colorsys
 import math
 
 import numpy as np
 import pygame
 from pygame import gfxdraw
-from shapely.geometry import Point
-from shapely.geometry.polygon import Polygon
 
 import constants
 
@@ -41,127 +40,178 @@ def calculate_update_vector(center_new, center_old, total_nodes, relative_nodes)
 
 
 def calculate_polygon(points, edges, radius, ignore_edges=False):
-    center = np.zeros((2,))
-    for point_pos in points.values():
-        center += np.array(point_pos)
-    center /= len(points)
-
-    distances = []
-    for point_id, point_pos in points.items():
-        distances.append((point_id, get_distance(center, point_pos)))
-
-    start_point = max(distances, key=lambda x: x[1])[0]
-    polygon = [start_point]
-    current_angle = get_angle(center, points[start_point]) % 360
-    current_point = start_point
-    prev_point = None
-
-    next_vertex_id = max(points.keys()) + 1
-
-    m = 0
-    n = 0
-    # add intersection of lines as points to guarantee a path around the group
-    while m < len(edges):
-        n = m + 1
-        while n < len(edges):
-            edge1 = edges[m]
-            edge2 = edges[n]
-            edge1_p1 = points[edge1[0]]
-            edge1_p2 = points[edge1[1]]
-            edge2_p1 = points[edge2[0]]
-            edge2_p2 = points[edge2[1]]
-            n += 1
-            if edge1_p1 in (edge2_p1, edge2_p2) or edge1_p2 in (edge2_p1, edge2_p2):
-                continue
-            intersection = line_line_intersect(edge1_p1, edge1_p2, edge2_p1, edge2_p2)
-            if intersection is not None:
-                edges.remove(edge1)
-                edges.remove(edge2)
-                m -= 1
-                n -= 1
-                points[next_vertex_id] = intersection
-                edges.append((edge1[0], next_vertex_id))
-                edges.append((edge1[1], next_vertex_id))
-                edges.append((edge2[0], next_vertex_id))
-                edges.append((edge2[1], next_vertex_id))
-                next_vertex_id += 1
-        m += 1
-
-    while True:
-        angles = []
-        for point_id, point_pos in points.items():
-            if point_id == current_point or point_id == prev_point:
-                continue
-
-            if not ignore_edges and (current_point, point_id) not in edges and (point_id, current_point) not in edges:
-                continue
-
-            current_point_pos = points[current_point]
-            angle = get_angle(current_point_pos, point_pos)
-            angles.append((point_id, angle))
-
-        if len(angles) == 0:
-            # in this case there is only the path back to the previous vertex
-            current_point, prev_point = prev_point, current_point
-            polygon.append(current_point)
-            current_angle = (current_angle - 180) % 360
-        else:
-            # calculate angle mod 360
-            angles = map(lambda x: (x[0], x[1] % 360), angles)
-
-            prev_point = current_point
-            current_point, current_angle = min(angles, key=lambda x: (x[1] - current_angle) % 360 if (x[1] - current_angle) % 360 != 0 else 360)
-            current_angle = (current_angle - 180) % 360
-            polygon.append(current_point)
-
-        if current_point == start_point:
-            polygon_points = [points[vertex_id] for vertex_id in polygon]
-            polygon_obj = Polygon(polygon_points)
-            finished = True
-            for point in points.values():
-                if not (polygon_obj.contains(Point(*point)) or point in polygon_points):
-                    finished = False
-                    break
-            if finished:
-                break
-            else:
-                continue
-
-    rounded_polygon = []
-
-    for i in range(len(polygon) - 1):
-        current_point = np.array(points[polygon[i]])
-        next_point = np.array(points[polygon[i + 1]])
-        centerx, centery = tuple((current_point + next_point) / 2)
-        length = math.hypot(*(current_point - next_point))
-        angle = math.atan2(current_point[1] - next_point[1], current_point[0] - next_point[0])
-        length2 = length / 2
-        sin_ang, cos_ang = math.sin(angle), math.cos(angle)
-
-        radius_sin_ang = radius * sin_ang
-        radius_cos_ang = radius * cos_ang
-        length2_sin_ang = length2 * sin_ang
-        length2_cos_ang = length2 * cos_ang
-
-        ul = (centerx + length2_cos_ang - radius_sin_ang,
-              centery + radius_cos_ang + length2_sin_ang)
-        ur = (centerx - length2_cos_ang - radius_sin_ang,
-              centery + radius_cos_ang - length2_sin_ang)
-
-        rounded_polygon.append(ul)
-        rounded_polygon.append(ur)
-
-    i = 0
-    while i <= len(rounded_polygon) - 4:
-        intersection = line_line_intersect(rounded_polygon[i], rounded_polygon[i+1], rounded_polygon[i+2], rounded_polygon[i+3])
-        if intersection is not None:
-            rounded_polygon.pop(i+1)
-            rounded_polygon.pop(i+1)
-            rounded_polygon.insert(i+1, round_pos(intersection))
-            continue
-        i += 1
-
-    return tuple(rounded_polygon)
+    # the outline of a group is the outer boundary of its points and edges, or of its points only if the edges are
+    # ignored, moved outwards by radius, it starts at the point farthest from the center
+    ids = list(points.keys())
+    positions = np.array([points[point_id] for point_id in ids], dtype=float)
+    center = positions.mean(axis=0)
+    start = int(np.linalg.norm(positions - center, axis=1).argmax())
+
+    if (positions == positions[start]).all():
+        # all points are at the same position, so there is no boundary and the outline is a square around them
+        x, y = positions[start].tolist()
+        return (x - radius, y - radius), (x + radius, y - radius), (x + radius, y + radius), (x - radius, y + radius)
+
+    if ignore_edges:
+        boundary = get_convex_hull(positions, start)
+    else:
+        indices = dict((point_id, index) for index, point_id in enumerate(ids))
+        segments = np.array([(indices[point_id1], indices[point_id2]) for point_id1, point_id2 in edges],
+                            dtype=int).reshape(-1, 2)
+        boundary = get_outer_boundary(positions, segments, start, center)
+
+    return offset_boundary(boundary, radius)
+
+
+def get_segment_intersections(positions, segments):
+    # (segment, other segment, position on segment, position on other segment, intersection) of all crossing segments,
+    # the segments are sorted by their left end and every segment is only tested against the segments that start before
+    # it ends, this sort and sweep over the x intervals is quadratic if most segments overlap horizontally, so the pairs
+    # are tested in chunks of at most GRAPH_GROUP_POLYGON_MAX_PAIRS
+    ends = positions[segments]
+    left = ends[:, :, 0].min(axis=1)
+    right = ends[:, :, 0].max(axis=1)
+    order = np.argsort(left, kind='stable')
+    counts = np.searchsorted(left[order], right[order], side='right') - np.arange(len(order)) - 1
+    pair_offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    crossings = []
+    chunk_start = 0
+    while chunk_start < len(order):
+        chunk_end = np.searchsorted(pair_offsets, pair_offsets[chunk_start] + constants.GRAPH_GROUP_POLYGON_MAX_PAIRS,
+                                    side='right') - 1
+        chunk_end = max(chunk_end, chunk_start + 1)
+        chunk_counts = counts[chunk_start:chunk_end]
+        first = np.repeat(np.arange(chunk_start, chunk_end), chunk_counts)
+        second = (first + 1 + np.arange(chunk_counts.sum())
+                  - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts))
+        crossings.append(get_crossings(ends, order[first], order[second]))
+        chunk_start = chunk_end
+
+    if len(crossings) == 0:
+        return get_crossings(ends, np.zeros(0, dtype=int), np.zeros(0, dtype=int))
+    return tuple(np.concatenate(values) for values in zip(*crossings))
+
+
+def get_crossings(ends, segment1, segment2):
+    # the pairs of segments that cross, in the same form as get_segment_intersections
+    p0, p1 = ends[segment1, 0], ends[segment1, 1]
+    q0, q1 = ends[segment2, 0], ends[segment2, 1]
+    # segments that share an end or do not overlap vertically do not cross, as in line_line_intersect
+    shared = ((p0 == q0).all(axis=1) | (p0 == q1).all(axis=1) | (p1 == q0).all(axis=1) | (p1 == q1).all(axis=1))
+    overlapping = ((np.minimum(p0[:, 1], p1[:, 1]) <= np.maximum(q0[:, 1], q1[:, 1]))
+                   & (np.minimum(q0[:, 1], q1[:, 1]) <= np.maximum(p0[:, 1], p1[:, 1])))
+    d = (p1[:, 0] - p0[:, 0]) * (q1[:, 1] - q0[:, 1]) + (p1[:, 1] - p0[:, 1]) * (q0[:, 0] - q1[:, 0])
+    candidates = ~shared & overlapping & (d != 0)
+    p0, p1, q0, q1, d = p0[candidates], p1[candidates], q0[candidates], q1[candidates], d[candidates]
+    segment1, segment2 = segment1[candidates], segment2[candidates]
+
+    t = ((q0[:, 0] - p0[:, 0]) * (q1[:, 1] - q0[:, 1]) + (q0[:, 1] - p0[:, 1]) * (q0[:, 0] - q1[:, 0])) / d
+    u = ((q0[:, 0] - p0[:, 0]) * (p1[:, 1] - p0[:, 1]) + (q0[:, 1] - p0[:, 1]) * (p0[:, 0] - p1[:, 0])) / d
+    crossing = (0 <= t) & (t <= 1) & (0 <= u) & (u <= 1)
+    t, u = t[crossing], u[crossing]
+    intersections = np.round(p1[crossing] * t[:, None] + p0[crossing] * (1 - t[:, None])).reshape(-1, 2)
+    return segment1[crossing], segment2[crossing], t, u, intersections
+
+
+def get_outer_boundary(positions, segments, start, center):
+    # the crossings of the segments become points, so the segments form a planar graph, its outer face is walked along
+    # the half edges: after arriving at a point the walk leaves along the next half edge counterclockwise from the one
+    # it arrived on
+    segment1, segment2, t, u, intersections = get_segment_intersections(positions, segments)
+
+    # points at the same position are one point of the planar graph
+    nodes, node_ids = np.unique(np.concatenate((positions, intersections)), axis=0, return_inverse=True)
+    node_ids = node_ids.reshape(-1)
+    intersection_ids = node_ids[len(positions):]
+
+    # every segment is split at its intersections in the order along the segment
+    segment_range = np.arange(len(segments))
+    split_segments = np.concatenate((segment_range, segment_range, segment1, segment2))
+    split_positions = np.concatenate((np.zeros(len(segments)), np.ones(len(segments)), t, u))
+    split_ids = np.concatenate((node_ids[segments[:, 0]], node_ids[segments[:, 1]], intersection_ids, intersection_ids))
+    order = np.lexsort((split_positions, split_segments))
+    split_segments, split_ids = split_segments[order], split_ids[order]
+    same_segment = split_segments[:-1] == split_segments[1:]
+    edges = np.stack((split_ids[:-1][same_segment], split_ids[1:][same_segment]), axis=1)
+    edges = np.unique(np.sort(edges[edges[:, 0] != edges[:, 1]], axis=1), axis=0)
+
+    # half edges sorted by their origin and then by their angle
+    origins = np.concatenate((edges[:, 0], edges[:, 1]))
+    targets = np.concatenate((edges[:, 1], edges[:, 0]))
+    difference = nodes[targets] - nodes[origins]
+    angles = np.degrees(np.arctan2(difference[:, 1], difference[:, 0])) % 360
+    order = np.lexsort((angles, origins))
+    origins, targets, angles = origins[order], targets[order], angles[order]
+    first_half_edges = np.searchsorted(origins, np.arange(len(nodes)))
+    last_half_edges = np.searchsorted(origins, np.arange(len(nodes)), side='right')
+
+    # the twin of a half edge runs from its target to its origin, the next half edge follows the twin at the target
+    keys = origins * len(nodes) + targets
+    key_order = np.argsort(keys)
+    twins = key_order[np.searchsorted(keys[key_order], targets * len(nodes) + origins)]
+    following = twins + 1
+    wrapped = following == last_half_edges[targets]
+    following[wrapped] = first_half_edges[targets[wrapped]]
+
+    # the walk starts away from the center, on the first half edge counterclockwise from there
+    start_node = node_ids[start]
+    start_half_edges = np.arange(first_half_edges[start_node], last_half_edges[start_node])
+    outwards = nodes[start_node] - center
+    start_angle = np.degrees(np.arctan2(outwards[1], outwards[0])) % 360
+    rotations = (angles[start_half_edges] - start_angle) % 360
+    rotations[rotations == 0] = 360
+    first_half_edge = start_half_edges[rotations.argmin()]
+
+    following = following.tolist()
+    walk = [first_half_edge]
+    half_edge = following[first_half_edge]
+    while half_edge != first_half_edge:
+        walk.append(half_edge)
+        half_edge = following[half_edge]
+    return nodes[np.append(origins[walk], start_node)]
+
+
+def get_convex_hull(positions, start):
+    # the convex hull counterclockwise from the start point and back to it, as walked by get_outer_boundary
+    points = np.unique(positions, axis=0).tolist()
+    hull = []
+    for part in (points, points[::-1]):
+        lower = []
+        for point in part:
+            while len(lower) > 1 and ((lower[-1][0] - lower[-2][0]) * (point[1] - lower[-2][1])
+                                      - (lower[-1][1] - lower[-2][1]) * (point[0] - lower[-2][0])) <= 0:
+                lower.pop()
+            lower.append(point)
+        hull.extend(lower[:-1])
+
+    hull = hull or points
+    index = hull.index(positions[start].tolist())
+    return np.array(hull[index:] + hull[:index + 1])
+
+
+def offset_boundary(boundary, radius):
+    # every side of the boundary is moved outwards by radius, the sides at concave corners overlap and are cut at their
+    # intersection, at convex corners the gap between the sides is bridged by a straight line
+    current, following = boundary[:-1], boundary[1:]
+    difference = current - following
+    angles = np.arctan2(difference[:, 1], difference[:, 0])
+    normals = radius * np.stack((-np.sin(angles), np.cos(angles)), axis=1)
+    starts, ends = current + normals, following + normals
+
+    p0, p1, q0, q1 = starts[:-1], ends[:-1], starts[1:], ends[1:]
+    d = (p1[:, 0] - p0[:, 0]) * (q1[:, 1] - q0[:, 1]) + (p1[:, 1] - p0[:, 1]) * (q0[:, 0] - q1[:, 0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = ((q0[:, 0] - p0[:, 0]) * (q1[:, 1] - q0[:, 1]) + (q0[:, 1] - p0[:, 1]) * (q0[:, 0] - q1[:, 0])) / d
+        u = ((q0[:, 0] - p0[:, 0]) * (p1[:, 1] - p0[:, 1]) + (q0[:, 1] - p0[:, 1]) * (p0[:, 0] - p1[:, 0])) / d
+        intersections = np.round(p1 * t[:, None] + p0 * (1 - t[:, None]))
+    cut = (d != 0) & (0 <= t) & (t <= 1) & (0 <= u) & (u <= 1)
+
+    # every side contributes its start unless the previous side was cut there, and its end or the cut with the next side
+    polygon_starts = np.concatenate(([True], ~cut))
+    ends[:-1][cut] = intersections[cut]
+    polygon = np.stack((starts, ends), axis=1)[np.stack((polygon_starts, np.ones(len(starts), dtype=bool)), axis=1)]
+    return tuple(map(tuple, polygon.tolist()))
 
 
 def ndarray_to_surface(ndarray):
@@ -288,15 +338,41 @@ def line_line_intersect(P0, P1, Q0, Q1):
     return None
 
 
+# fonts are loaded once per size for the whole game
+fonts = {}
+# (text, size, color) -> rendered text, the least recently used texts are dropped first
+rendered_texts = collections.OrderedDict()
+
+
+def get_font(size):
+    if size not in fonts:
+        fonts[size] = pygame.font.SysFont(constants.FONT_NAME, size)
+    return fonts[size]
+
+
+def render_text(text, size, color=(0, 0, 0)):
+    # the returned surface is shared, it must only be blitted and not drawn on
+    key = (text, size, tuple(color))
+    if key in rendered_texts:
+        rendered_texts.move_to_end(key)
+        return rendered_texts[key]
+
+    text_surface = get_font(size).render(text, True, color)
+    rendered_texts[key] = text_surface
+    if len(rendered_texts) > constants.TEXT_CACHE_MAX_ENTRIES:
+        rendered_texts.popitem(last=False)
+    return text_surface
+
+
 # found here: https://stackoverflow.com/a/42015712
-def blit_text(surface, text, pos, font, color=pygame.Color('black')):
+def blit_text(surface, text, pos, font_size, color=pygame.Color('black')):
     words = [word.split(' ') for word in text.splitlines()]  # 2D array where each row is a list of words.
-    space = font.size(' ')[0]  # The width of a space.
+    space = get_font(font_size).size(' ')[0]  # The width of a space.
     max_width, max_height = surface.get_size()
     x, y = pos
     for line in words:
         for word in line:
-            word_surface = font.render(word, True, color)
+            word_surface = render_text(word, font_size, color)
             word_width, word_height = word_surface.get_size()
             if x + word_width >= max_width:
                 x = pos[0]  # Reset the x.